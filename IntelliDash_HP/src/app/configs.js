@@ -1,2 +1,4 @@
 // export const API_ROOT = 'http://127.0.0.1:5000'
-export const API_ROOT = 'https://dashboard-api-266780815120.europe-west3.run.app'
\ No newline at end of file
+export const API_ROOT = 'https://dashboard-api-266780815120.europe-west3.run.app'
+// chart values as plain lists ("compact" for typed columns, decoded by payload.js)
+export const PAYLOAD_FORMAT = 'json'
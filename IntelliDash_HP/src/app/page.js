@@ -200,7 +200,10 @@ export default function Dashboard() {
               onDrop={(e) => handleDrop(e, i)}
               onDragEnd={handleDragEnd}>
               <div className={styles.chartHeader}>
-                <h2 className={styles.chartTitle}>{c.chart.title}</h2>
+                <h2 className={styles.chartTitle}
+                  title={c.values?.estimated ? 'Estimated from a sample of a large file' : undefined}>
+                  {c.chart.title}{c.values?.estimated ? ' (est.)' : ''}
+                </h2>
                 {editMode && (
                   <div className={styles.resizeControls}>
                     <div className={styles.resizeGroup}>
@@ -0,0 +1,49 @@
+// Decoder for the server's "compact" chart values (Server/payload.py):
+// typed columns, base64 of little-endian bytes, dates as days (datetimes as seconds) since 1970-01-01
+
+const ARRAY_TYPES = { i1: Int8Array, i2: Int16Array, i4: Int32Array }
+const DAY_MS = 24 * 3600 * 1000
+
+const bytes = base64 => Uint8Array.from(atob(base64), c => c.charCodeAt(0)).buffer
+
+const decodeColumn = column => {
+  switch (column.type) {
+    case "f32":
+      return Array.from(new Float32Array(bytes(column.data)), v => Number.isNaN(v) ? null : v)
+    case "f64":
+      return Array.from(new Float64Array(bytes(column.data)), v => Number.isNaN(v) ? null : v)
+    case "i32":
+      return Array.from(new Int32Array(bytes(column.data)))
+    case "bool":
+      return Array.from(new Uint8Array(bytes(column.data)), v => v === 1)
+    case "dict": {
+      const codes = new ARRAY_TYPES[column.code_type](bytes(column.codes))
+      return Array.from(codes, code => code < 0 ? null : column.values[code])
+    }
+    case "date": {
+      let day = column.start
+      return Array.from(new Int32Array(bytes(column.deltas)), delta => {
+        day += delta
+        return new Date(day * DAY_MS).toISOString().slice(0, 10)
+      })
+    }
+    case "datetime": {
+      let second = column.start
+      return Array.from(new Int32Array(bytes(column.deltas)), delta => {
+        second += delta
+        return new Date(second * 1000).toISOString().slice(0, 19)
+      })
+    }
+    default:
+      throw new Error(`Unknown column type: ${column.type}`)
+  }
+}
+
+// chart values back to { x: [...], y: [...] }, charts in the default format are returned as is
+export const decodeValues = values => {
+  if (values?.encoding !== "columnar") return values
+  const { encoding, ...columns } = values
+  return Object.fromEntries(Object.entries(columns).map(([name, column]) => [name, decodeColumn(column)]))
+}
+
+export const decodeDashboard = charts => (charts || []).map(chart => ({ ...chart, values: decodeValues(chart.values) }))
@@ -1,7 +1,8 @@
 "use client"
 import { useState } from "react"
 import { FileUploader } from "react-drag-drop-files"
-import { API_ROOT } from '../app/configs.js'
+import { API_ROOT, PAYLOAD_FORMAT } from '../app/configs.js'
+import { decodeDashboard } from '../app/payload.js'
 import { useTheme } from '../app/ThemeContext'
 import styles from '../styles/UploadFilePanel.module.css'
 import IconButton from "./IconButton"
@@ -11,6 +12,21 @@ import Panel from "./Panel"
 
 const FILE_TYPES = ["CSV", "XLSX", "XLS"]
 const MAX_FILE_SIZE = 10 // in MB
+const POLL_INTERVAL = 1500 // in ms
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms))
+
+// poll the dashboard job until it finishes, returns the final job status
+const waitForJob = async (jobId, onProgress) => {
+  while (true) {
+    const response = await fetch(`${API_ROOT}/jobs/${jobId}`)
+    const job = await response.json()
+    if (!response.ok) throw new Error(job.error || "Dashboard job not found")
+    if (job.status === "completed" || job.status === "failed") return job
+    onProgress(job)
+    await sleep(POLL_INTERVAL)
+  }
+}
 
 
 export default function UploadFilePanel({ isOpen, onClose, onDashboardLoad }) {
@@ -54,6 +70,7 @@ export default function UploadFilePanel({ isOpen, onClose, onDashboardLoad }) {
     try {
       const formData = new FormData()
       formData.append("file", selectedFile)
+      formData.append("payload_format", PAYLOAD_FORMAT)
 
       const response = await fetch(`${API_ROOT}/upload`, {
         method: "POST",
@@ -61,10 +78,16 @@ export default function UploadFilePanel({ isOpen, onClose, onDashboardLoad }) {
       })
 
       if (response.ok) {
-        const data = await response.json()
+        const { job_id } = await response.json()
+        const job = await waitForJob(job_id, job => setMessage(`Processing: ${job.stage}...`))
+        if (job.status === "failed") {
+          setMessage(`Error: ${job.error || "Dashboard creation failed"}`)
+          setUploadResult(2)
+          return
+        }
         setMessage(`Uploaded: ${selectedFile.name}`)
         setUploadResult(1)
-        onClose(data)
+        onClose({ ...job.result, dashboard: decodeDashboard(job.result.dashboard) })
 
       } else {
         const err = await response.json()
@@ -81,6 +104,7 @@ export default function UploadFilePanel({ isOpen, onClose, onDashboardLoad }) {
   }
 
   const renderMessage = () => {
+    if (uploading && message) return <span className={styles.message}>{message}</span>
     if (selectedFile && uploadResult === 0) return <>
       <span>Selected file: </span>
       <span className={styles.selectedFile}>{selectedFile.name}</span>
@@ -18,9 +18,139 @@ MAX_N_TYPES = 99
 
 MAX_DENSITY = 200
 
+# How a chart with more than MAX_DENSITY points is thinned, per chart type (see downsampling.py):
+# "stride" every n-th point, "lttb" largest-triangle-three-buckets and "minmax" min / max per
+# bucket keep the shape and peaks of a line, "grid" keeps outliers and density of a scatter
+DOWNSAMPLING = {
+    "line": "lttb",
+    "bar": "stride",
+    "scatter": "grid",
+}
+
+# Chart values in the job result: "json" (x / y lists) or "compact" (typed columns: float32,
+# dictionary-encoded categories, delta-encoded dates, see payload.py). Overridable per upload
+PAYLOAD_FORMAT = "json"
+
+# Charts with an aggregation share one groupby(x).agg({y: [aggregations]}) per distinct x
+VISUALIZATION_SHARED_GROUPBY = True
+
+# Aggregated charts over a datetime x are resampled to the finest of these periods (day, week,
+# month, quarter, year) that keeps them within MAX_DENSITY points; empty to group by raw values
+RESAMPLE_FREQUENCIES = ["D", "W", "M", "Q", "Y"]
+
+# Optional pre-aggregation after analytics (cube.py): sum / count / sum of squares of every numeric
+# column per value of each categorical, integer or date (by day) column with at most
+# CUBE_MAX_CARDINALITY values and at most CUBE_MAX_UNIQUE_RATIO values per row (keeps ids out).
+# Grouped charts are answered from it, and it is cached next to the dashboard for re-rendering
+AGGREGATION_CUBE = False
+CUBE_MAX_CARDINALITY = 1000
+CUBE_MAX_UNIQUE_RATIO = 0.05
+
 # add dash "-" to indicate prefix
 CSV_UNIT = {
     "weekly_sales": "$-",
     "temperature": "°F",
     "fuel_price": "USD"
-}
\ No newline at end of file
+}
+
+# Dashboard result cache: "memory", "disk" (stored under uploads/cache) or None to disable
+DASHBOARD_CACHE_BACKEND = "memory"
+DASHBOARD_CACHE_MAX_ENTRIES = 64
+DASHBOARD_CACHE_TTL = 24 * 3600  # seconds, None = never expire
+
+# LLM plan cache keyed on the dataset schema (column names, dtypes, cardinality buckets)
+PLAN_CACHE_BACKEND = "memory"
+PLAN_CACHE_MAX_ENTRIES = 256
+PLAN_CACHE_TTL = 7 * 24 * 3600  # seconds, None = never expire
+PLAN_CACHE_REVALIDATE = True  # check cached charts against the new frame before reuse
+
+# Background dashboard jobs: running workers, jobs allowed to wait (429 beyond that), seconds to keep results
+JOB_MAX_WORKERS = 2
+JOB_MAX_QUEUE = 8
+JOB_RESULT_TTL = 3600
+
+# Uploads up to UPLOAD_MEMORY_LIMIT_MB are kept in memory, larger ones are written to
+# uploads/tmp while the request is parsed; requests above UPLOAD_MAX_SIZE_MB get a 413
+UPLOAD_MEMORY_LIMIT_MB = 64
+UPLOAD_MAX_SIZE_MB = 4096
+
+# Raw upload archival: "gcs" (bucket below) or "local" (uploads/archive, no GCP needed)
+ARCHIVE_BACKEND = "gcs"
+GCS_BUCKET_NAME = "intellidash"  # Make sure to create this bucket in GCP console
+ARCHIVE_WAIT = False  # True: /jobs result waits for the archive upload before completing
+ARCHIVE_MAX_WORKERS = 4
+ARCHIVE_MAX_RETRIES = 3
+ARCHIVE_RETRY_BACKOFF = 1.0  # seconds, doubled after every failed attempt
+ARCHIVE_MAX_PENDING = 8  # archives in flight; a job starting another one waits, keeping its job slot
+
+# Ingestion: CSV files larger than the budget are read in chunks; downstream agents
+# get a random sample of INGESTION_SAMPLE_ROWS rows, the metadata covers the whole file
+INGESTION_MEMORY_BUDGET_MB = 512
+INGESTION_CHUNK_ROWS = 100_000
+INGESTION_SAMPLE_ROWS = 200_000
+
+# CSV dtype sniffing: rows read to type columns up front, and the max unique/rows ratio
+# for a string column to be loaded as category (dates are detected and parsed as well)
+INGESTION_SNIFF_ROWS = 10_000
+INGESTION_CATEGORY_RATIO = 0.5
+
+# Report the peak memory of the cleaning steps in the cleaning report; uses tracemalloc,
+# which slows down string-heavy cleaning considerably, so it is meant for diagnostics
+CLEANING_TRACK_MEMORY = False
+
+# Numeric coercion of string columns: share of values that must parse as numbers,
+# and the sample size checked before converting a whole column
+NUMERIC_THRESHOLD = 0.8
+NUMERIC_SAMPLE_SIZE = 1000
+
+# Missing values: "drop" (remove the row), "mean", "median", "mode", "ffill" or "none";
+# per-column overrides use the standardized (lowercase) column name
+CLEANING_MISSING_STRATEGY = "drop"
+CLEANING_COLUMN_STRATEGIES = {}  # e.g. {"temperature": "median"}
+
+# Correlations reported to the LLM: "pearson" or "spearman", minimum |r|, and for wide
+# tables only the CORRELATION_TOP_K strongest pairs (None = all pairs above the threshold);
+# tables with more rows are sampled down to CORRELATION_SAMPLE_ROWS first
+CORRELATION_METHOD = "pearson"
+CORRELATION_THRESHOLD = 0.5
+CORRELATION_TOP_K = 50
+CORRELATION_SAMPLE_ROWS = 200_000
+
+# Categorical insights: columns with at least SKETCH_MIN_ROWS rows, or whose first
+# SKETCH_SAMPLE_ROWS values are more than SKETCH_CARDINALITY_RATIO unique (ids, emails),
+# are summarized with HyperLogLog (unique count) and space-saving (top values) sketches
+SKETCH_MIN_ROWS = 1_000_000
+SKETCH_SAMPLE_ROWS = 10_000
+SKETCH_CARDINALITY_RATIO = 0.5
+SKETCH_PRECISION = 14  # 2**14 registers, ~0.8% error on unique counts
+SKETCH_CAPACITY = 1024  # counters kept for top values
+
+# Threads used by the analytics stage to overlap the LLM calls with the statistics
+ANALYTICS_MAX_WORKERS = 4
+
+# Ask the LLM for domain and chart plan in one structured-output call instead of two
+ANALYTICS_FUSED_LLM_CALL = False
+
+# LLM prompt context: estimated token budget for statistics, correlations and categorical
+# insights, most informative columns first, at most PROMPT_MAX_COLUMNS of them
+PROMPT_TOKEN_BUDGET = 6000
+PROMPT_MAX_COLUMNS = 60
+PROMPT_SAMPLE_ROWS = 5
+
+# LLM client: "openai" or "fake" (local canned responses, a generic domain and no charts, for tests);
+# timeouts in seconds, 429/5xx/timeouts are retried with exponential backoff, and all calls of the
+# process share one connection pool and one requests/tokens per minute budget (0 = unlimited)
+LLM_BACKEND = "openai"
+LLM_TIMEOUT = 60
+LLM_MAX_RETRIES = 4
+LLM_RETRY_BACKOFF = 1.0
+LLM_MAX_CONNECTIONS = 20
+LLM_REQUESTS_PER_MINUTE = 500
+LLM_TOKENS_PER_MINUTE = 30_000
+LLM_DEFAULT_COMPLETION_TOKENS = 1000  # counted against the token budget when max_tokens is not set
+
+# Cold start: main.py imports only Flask; the pipeline (pandas, langgraph, openai) is loaded
+# by a background warmup thread at startup, or on the first upload when this is off.
+# benchmarks/check_importtime.py fails when "import main" takes longer than the budget
+WARMUP_ON_START = True
+COLD_START_IMPORT_BUDGET_MS = 400
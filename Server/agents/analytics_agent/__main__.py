@@ -1,10 +1,117 @@
 
 from typing import Optional
+import copy
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-from agents.llm import get_llm_client
+from agents.llm import get_llm_client, estimate_tokens
 import json
-from CFG import CHART_TYPES, MIN_N_CHARTS, MAX_N_CHARTS, MIN_N_TYPES, MAX_N_TYPES
+from CFG import CHART_TYPES, MIN_N_CHARTS, MAX_N_CHARTS, MIN_N_TYPES, MAX_N_TYPES, PLAN_CACHE_REVALIDATE
+from CFG import CORRELATION_METHOD, CORRELATION_THRESHOLD, CORRELATION_TOP_K, CORRELATION_SAMPLE_ROWS
+from CFG import ANALYTICS_MAX_WORKERS, ANALYTICS_FUSED_LLM_CALL
+from CFG import PROMPT_TOKEN_BUDGET, PROMPT_MAX_COLUMNS, PROMPT_SAMPLE_ROWS
+from CFG import SKETCH_MIN_ROWS, SKETCH_SAMPLE_ROWS, SKETCH_CARDINALITY_RATIO, SKETCH_PRECISION, SKETCH_CAPACITY
+from cache import get_plan_cache, config_fingerprint
+from profiling import ensure_profile
+from sketches import CategoricalSketch
+
+
+# upper bounds of the cardinality buckets used in the schema signature
+CARDINALITY_BUCKETS = [
+    (2, "binary"),
+    (5, "low"),  # pie charts are allowed up to 5 unique values
+    (50, "medium"),
+    (1000, "high"),
+]
+
+
+def _cardinality_bucket(n_unique: int) -> str:
+    for upper, name in CARDINALITY_BUCKETS:
+        if n_unique <= upper:
+            return name
+    return "very_high"
+
+
+def _column_cardinality(values: pd.Series, head_rows: int = 10_000) -> int:
+    # a column whose first rows already exceed the highest bucket needs no full pass
+    n_unique = int(values.head(head_rows).nunique())
+    if n_unique > CARDINALITY_BUCKETS[-1][0] or len(values) <= head_rows:
+        return n_unique
+    return int(values.nunique())
+
+
+def schema_signature(df: pd.DataFrame) -> str:
+    """Hash of column names, dtype kinds and cardinality buckets, stable across exports of the same table"""
+    columns = []
+    for col in df.columns:
+        columns.append([
+            str(col).strip().lower(),
+            df[col].dtype.kind,
+            _cardinality_bucket(_column_cardinality(df[col])),
+        ])
+    payload = json.dumps({"columns": columns, "config": config_fingerprint()}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# columns correlated against all others per matrix product, bounds memory to block x columns
+CORRELATION_BLOCK_SIZE = 256
+
+
+def _standardize(values: np.ndarray) -> np.ndarray:
+    """Center and scale columns so that Z.T @ Z / (n - 1) is the Pearson matrix; constant columns become NaN"""
+    std = values.std(axis=0, ddof=1)
+    std[std == 0] = np.nan
+    return (values - values.mean(axis=0)) / std
+
+
+def strong_correlations(values: np.ndarray, threshold: float, top_k: Optional[int] = None,
+                        block_size: int = CORRELATION_BLOCK_SIZE):
+    """
+    Upper-triangle pairs (i, j, r) of a NaN-free block with |r| >= threshold, in row-major order,
+    or the top_k strongest pairs by |r|. The matrix is built block by block of rows.
+    """
+    n, k = values.shape
+    if n < 2 or k < 2:
+        return []
+    z = _standardize(values)
+    rows, cols, corrs = [], [], []
+    for start in range(0, k, block_size):
+        stop = min(start + block_size, k)
+        block = z[:, start:stop].T @ z[:, start:] / (n - 1)
+        # keep j > i only
+        i, j = np.nonzero(np.triu(np.abs(np.nan_to_num(block)) >= threshold, k=1))
+        rows.append(i + start)
+        cols.append(j + start)
+        corrs.append(np.clip(block[i, j], -1.0, 1.0))
+        if top_k is not None:
+            rows, cols, corrs = _top_pairs(rows, cols, corrs, top_k)
+    rows, cols, corrs = (np.concatenate(a) for a in (rows, cols, corrs))
+    if top_k is not None:
+        order = np.argsort(-np.abs(corrs), kind="stable")
+        rows, cols, corrs = rows[order], cols[order], corrs[order]
+    return list(zip(rows.tolist(), cols.tolist(), corrs.tolist()))
+
+
+def _top_pairs(rows: list, cols: list, corrs: list, top_k: int):
+    rows, cols, corrs = (np.concatenate(a) for a in (rows, cols, corrs))
+    if len(corrs) > top_k:
+        keep = np.sort(np.argpartition(-np.abs(corrs), top_k - 1)[:top_k])
+        rows, cols, corrs = rows[keep], cols[keep], corrs[keep]
+    return [rows], [cols], [corrs]
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _round_values(values: dict, digits: int = 4) -> dict:
+    # 4 significant digits are plenty for the LLM and much shorter than repr(float)
+    return {
+        key: float(f"{value:.{digits}g}") if isinstance(value, float) and np.isfinite(value) else value
+        for key, value in values.items()
+    }
 
 
 class AnalyticsState:
@@ -16,63 +123,109 @@ class AnalyticsState:
         statistics: Optional[dict] = None,
         domain_info: Optional[dict] = None,
         visualization_plan: Optional[dict] = None,
+        profile=None,
+        sketches: Optional[dict] = None,
+        sample_scale: float = 1.0,
         error: Optional[str] = None,
         status: str = "pending",
     ):
         self.cleaned_data = cleaned_data
+        # rows of the whole file per row of cleaned_data, above 1 when it is a sample (chunked ingestion)
+        self.sample_scale = sample_scale
         self.insights = insights if insights is not None else {}
         self.statistics = statistics if statistics is not None else {}
         self.domain_info = domain_info if domain_info is not None else {}
         self.visualization_plan = visualization_plan if visualization_plan is not None else {}
+        # profiling.Profile of cleaned_data, computed here when the cleaning agent did not provide one
+        self.profile = profile
+        # {column: CategoricalSketch} built over the whole file by chunked ingestion
+        self.sketches = sketches if sketches is not None else {}
+        # seconds spent per analysis task, tasks run concurrently so they overlap
+        self.timings: dict = {}
+        # estimated prompt tokens per LLM call
+        self.prompt_tokens: dict = {}
         self.error = error
         self.status = status
 
 
 class AnalyticsAgent:
 
-    def __init__(self):
+    def __init__(self, plan_cache=None, revalidate_plan: bool = PLAN_CACHE_REVALIDATE,
+                 fused_llm_call: bool = ANALYTICS_FUSED_LLM_CALL):
         self.llm_client = get_llm_client()
+        self.plan_cache = plan_cache if plan_cache is not None else get_plan_cache()
+        self.revalidate_plan = revalidate_plan
+        # one LLM call for domain and plan instead of two sequential ones
+        self.fused_llm_call = fused_llm_call
     
-    def _calculate_statistics(self, df: pd.DataFrame):
+    def _calculate_statistics(self, df: pd.DataFrame, profile=None):
 
-        stats = {}
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        
-        for col in numeric_cols:
-            stats[col] = {
-                'mean': float(df[col].mean()),
-                'median': float(df[col].median()),
-                'std': float(df[col].std()),
-                'min': float(df[col].min()),
-                'max': float(df[col].max()),
-                'q25': float(df[col].quantile(0.25)),
-                'q75': float(df[col].quantile(0.75)),
-            }
-        
-        return stats
+        profile = ensure_profile(df, profile)
+        return {col: dict(stats) for col, stats in profile.numeric.items()}
     
-    def _identify_correlations(self, df: pd.DataFrame, threshold: float = 0.5):
+    def _identify_correlations(self, df: pd.DataFrame, threshold: float = CORRELATION_THRESHOLD,
+                               method: str = CORRELATION_METHOD, top_k: Optional[int] = CORRELATION_TOP_K,
+                               sample_rows: Optional[int] = CORRELATION_SAMPLE_ROWS):
 
+        if method not in ("pearson", "spearman"):
+            raise ValueError(f"Unknown correlation method: {method}")
         numeric_df = df.select_dtypes(include=[np.number])
-        correlations = numeric_df.corr()
-        
-        strong_corrs = {}
-        for i in range(len(correlations.columns)):
-            for j in range(i+1, len(correlations.columns)):
-                corr_value = correlations.iloc[i, j]
-                if abs(corr_value) >= threshold:
-                    col1 = correlations.columns[i]
-                    col2 = correlations.columns[j]
-                    strong_corrs[f"{col1}_vs_{col2}"] = float(corr_value)
-        
-        return strong_corrs
-    
-    def _generate_categorical_insights(self, df: pd.DataFrame):
+        columns = numeric_df.columns
+        if len(columns) < 2:
+            return {}
+        if sample_rows and len(numeric_df) > sample_rows:
+            numeric_df = numeric_df.sample(n=sample_rows, random_state=0)
+
+        if method == "spearman":
+            numeric_df = numeric_df.rank()
+        values = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        if np.isnan(values).any():
+            # pairwise-complete correlations need pandas, the matrix is then computed in full
+            matrix = numeric_df.corr().to_numpy()
+            i, j = np.nonzero(np.triu(np.abs(np.nan_to_num(matrix)) >= threshold, k=1))
+            pairs = list(zip(i.tolist(), j.tolist(), matrix[i, j].tolist()))
+            if top_k is not None:
+                pairs = sorted(pairs, key=lambda pair: -abs(pair[2]))[:top_k]
+        else:
+            pairs = strong_correlations(values, threshold, top_k)
 
+        return {f"{columns[i]}_vs_{columns[j]}": float(r) for i, j, r in pairs}
+    
+    @staticmethod
+    def _use_sketch(values: pd.Series) -> bool:
+        """Sketch long columns and high-cardinality string columns; category codes are cheap to count exactly"""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return False
+        if len(values) >= SKETCH_MIN_ROWS:
+            return True
+        if len(values) <= SKETCH_SAMPLE_ROWS:
+            return False
+        sample = values.head(SKETCH_SAMPLE_ROWS).dropna()
+        return len(sample) > 0 and sample.nunique() / len(sample) > SKETCH_CARDINALITY_RATIO
+
+    @staticmethod
+    def _build_sketch(values: pd.Series, chunk_rows: int = SKETCH_SAMPLE_ROWS * 10) -> CategoricalSketch:
+        sketch = CategoricalSketch(SKETCH_PRECISION, SKETCH_CAPACITY)
+        for start in range(0, len(values), chunk_rows):
+            sketch.update(values.iloc[start:start + chunk_rows])
+        return sketch
+
+    def _generate_categorical_insights(self, df: pd.DataFrame, sketches: Optional[dict] = None):
+
+        sketches = sketches or {}
         insights = {}
-        categorical_cols = df.select_dtypes(include=['object']).columns
+        categorical_cols = df.select_dtypes(include=['object', 'category']).columns
         
         for col in categorical_cols:
+            sketch = sketches.get(col)
+            if sketch is None and self._use_sketch(df[col]):
+                sketch = self._build_sketch(df[col])
+            if sketch is not None:
+                insights[col] = {
+                    'unique_count': sketch.unique_count(),
+                    'top_values': sketch.top_values(5),
+                }
+                continue
             top_values = df[col].value_counts().head(5)
             insights[col] = {
                 'unique_count': int(df[col].nunique()),
@@ -81,11 +234,22 @@ class AnalyticsAgent:
         
         return insights
 
+    @staticmethod
+    def _data_quality(state: AnalyticsState) -> dict:
+        """Data quality of the profile, row counts estimated for the whole file when the data is a sample"""
+        quality = state.profile.data_quality()
+        if state.sample_scale != 1:
+            quality['sample_rows'] = quality['total_rows']
+            quality['total_rows'] = int(round(quality['total_rows'] * state.sample_scale))
+            quality['missing_values'] = int(round(quality['missing_values'] * state.sample_scale))
+        return quality
+
     def _classify_domain(self, state: AnalyticsState):
 
+        df = state.cleaned_data
         context = {
-            "Column names of datasets": list(state.cleaned_data.columns) if state.cleaned_data is not None else [],
-            "Sample data": state.cleaned_data.head(5).to_dict(orient='records') if state.cleaned_data is not None else []
+            "Column names of datasets": list(df.columns) if df is not None else [],
+            "Sample data": self._sample_records(df, list(df.columns)[:PROMPT_MAX_COLUMNS], PROMPT_SAMPLE_ROWS) if df is not None else []
         }
         # "numeric_columns": list(state.statistics.keys()) if state.statistics else [],
         # "categorical_columns": list(state.insights.get('categorical', {}).keys()) if state.insights else [],
@@ -103,9 +267,10 @@ class AnalyticsAgent:
         }}
 
         Context:
-        {json.dumps(context, indent=2)}
+        {compact_json(context)}
         """
         # print("Classify Domain Prompt:", prompt)
+        self._log_prompt(state, 'classify_domain', prompt)
 
         response = self.llm_client.chat.completions.create(
             model="gpt-4o",
@@ -117,7 +282,7 @@ class AnalyticsAgent:
         return self._extract_json(response.choices[0].message.content)
     
     
-    def _plan_visualizations(self, state: AnalyticsState, domain_info: dict):
+    def _chart_rules(self) -> dict:
         analysis_constraints = {
             "dashboard_type": "executive",
             "rules": [
@@ -148,21 +313,9 @@ class AnalyticsAgent:
                 analysis_constraints["rules"].append(
                     f"For {chart_type} charts, return at most {max_charts} charts"
                 )
-        
-        context = {
-            "domain": domain_info,
-            "statistics": state.statistics,
-            "correlations": state.insights.get('correlations', {}),
-            "categorical_insights": state.insights.get('categorical', {}),
-            "data_quality": state.insights.get('data_quality', {}),
-            # "columns": list(state.cleaned_data.columns) if state.cleaned_data is not None else [],
-            "sample_data": state.cleaned_data.head(1).to_dict(orient='records') if state.cleaned_data is not None else []
-        }
-        # print(state.cleaned_data.head(5))
-        # print("="*10)
-        # print(context["sample_data"])
-        # print("="*10)
+        return analysis_constraints
 
+    def _dashboard_constraints(self) -> str:
         if MIN_N_CHARTS < MAX_N_CHARTS:
             n_charts_str = f"between {MIN_N_CHARTS} and {MAX_N_CHARTS}"
         elif MIN_N_CHARTS == MAX_N_CHARTS:
@@ -170,12 +323,7 @@ class AnalyticsAgent:
         else:
             n_charts_str = f"at least {MIN_N_CHARTS}"
 
-        prompt = f"""
-        You are a senior data analyst specializing in the {domain_info["domain"]} domain.
-
-        Design a DASHBOARD tailored to this domain.
-
-        Rules Analysis: {analysis_constraints}
+        return f"""Rules Analysis: {self._chart_rules()}
 
         Constraints:
         - Each chart must be interpretable in under 5 seconds
@@ -188,7 +336,146 @@ class AnalyticsAgent:
 
         The reason must explain:
         1. A question answered
-        2. Decision it supports
+        2. Decision it supports"""
+
+    @staticmethod
+    def _log_prompt(state: AnalyticsState, name: str, prompt: str):
+        tokens = estimate_tokens(prompt)
+        state.prompt_tokens[name] = tokens
+        print(f"{name} prompt: ~{tokens} tokens ({len(prompt)} chars)")
+
+    def _sample_records(self, df: pd.DataFrame, columns: list, n_rows: int, budget: int = PROMPT_TOKEN_BUDGET // 4) -> list:
+        """First rows of the given columns, fewer rows if they do not fit the token budget"""
+        records = df[columns].head(n_rows).to_dict(orient='records')
+        while len(records) > 1 and estimate_tokens(compact_json(records)) > budget:
+            records = records[:-1]
+        return records
+
+    @staticmethod
+    def _pair_columns(pair: str, columns: set) -> tuple:
+        """The two columns of a "col1_vs_col2" key; names may contain "_vs_" themselves"""
+        parts = pair.split("_vs_")
+        for i in range(1, len(parts)):
+            col1, col2 = "_vs_".join(parts[:i]), "_vs_".join(parts[i:])
+            if col1 in columns and col2 in columns:
+                return col1, col2
+        return ()
+
+    def _column_scores(self, state: AnalyticsState) -> dict:
+        """
+        Informativeness of the profiled columns: numeric columns by relative spread and
+        strongest correlation, categorical columns by how well they group the rows
+        (constant and id-like columns score lowest).
+        """
+        columns = {str(col) for col in state.statistics} | {str(col) for col in state.insights.get('categorical', {})}
+        strongest = {}
+        for pair, corr in state.insights.get('correlations', {}).items():
+            for col in self._pair_columns(pair, columns):
+                strongest[col] = max(strongest.get(col, 0.0), abs(corr))
+
+        scores = {}
+        for col, stats in state.statistics.items():
+            std, mean = stats.get('std'), stats.get('mean')
+            if not std or not np.isfinite(std):
+                scores[col] = 0.0
+                continue
+            spread = min(std / (abs(mean) + 1e-9), 1.0)
+            scores[col] = 1.0 + spread + strongest.get(str(col), 0.0)
+
+        n_rows = max(state.insights.get('data_quality', {}).get('total_rows', 0), 1)
+        for col, insight in state.insights.get('categorical', {}).items():
+            n_unique = insight.get('unique_count', 0)
+            if n_unique <= 1 or n_unique >= 0.9 * n_rows:
+                scores[col] = 0.0
+            elif n_unique <= 50:
+                # good grouping columns are the x axes of most charts, rank them with the best numeric ones
+                scores[col] = 3.0
+            else:
+                scores[col] = 1.0 + 2 * 50 / n_unique
+        return scores
+
+    def _analysis_context(self, state: AnalyticsState, budget: int = PROMPT_TOKEN_BUDGET,
+                          max_columns: int = PROMPT_MAX_COLUMNS):
+        """
+        Statistics, correlations and categorical insights of the most informative columns
+        that fit the token budget. Returns (context, selected columns).
+        """
+        statistics = state.statistics
+        categorical = state.insights.get('categorical', {})
+        scores = self._column_scores(state)
+        ranked = sorted(scores, key=lambda col: -scores[col])
+
+        data_quality = state.insights.get('data_quality', {})
+        used = estimate_tokens(compact_json(data_quality))
+        selected_stats, selected_categorical = {}, {}
+        for col in ranked:
+            if len(selected_stats) + len(selected_categorical) >= max_columns:
+                break
+            if col in statistics:
+                entry = _round_values(statistics[col])
+                target = selected_stats
+            else:
+                entry = categorical[col]
+                target = selected_categorical
+            cost = estimate_tokens(compact_json({col: entry}))
+            if used + cost > budget:
+                # a wide column (many top values) must not keep out the smaller ones ranked after it
+                continue
+            target[col] = entry
+            used += cost
+            if used >= budget:
+                break
+
+        selected = set(map(str, selected_stats)) | set(map(str, selected_categorical))
+        correlations = {}
+        for pair, corr in state.insights.get('correlations', {}).items():
+            if not self._pair_columns(pair, selected):
+                continue
+            cost = estimate_tokens(compact_json({pair: corr}))
+            if used + cost > budget:
+                continue
+            correlations[pair] = round(corr, 3)
+            used += cost
+
+        context = {
+            "statistics": selected_stats,
+            "correlations": correlations,
+            "categorical_insights": selected_categorical,
+            "data_quality": data_quality,
+        }
+        omitted = len(scores) - len(selected)
+        if omitted:
+            context["omitted_columns"] = omitted
+        # columns that were not profiled (dates, booleans) are always kept
+        profiled = set(statistics) | set(categorical)
+        columns = [
+            col for col in state.cleaned_data.columns
+            if col not in profiled or str(col) in selected
+        ]
+        return context, columns
+
+    @staticmethod
+    def _sort_charts(results: dict) -> dict:
+        # bring all single_value charts to the front
+        if "charts" in results:
+            results["charts"].sort(key=lambda x: 0 if x["type"] == "single_value" else 1)
+        return results
+
+    def _plan_visualizations(self, state: AnalyticsState, domain_info: dict):
+        analysis_context, columns = self._analysis_context(state)
+        context = {
+            "domain": domain_info,
+            **analysis_context,
+            # "columns": list(state.cleaned_data.columns) if state.cleaned_data is not None else [],
+            "sample_data": self._sample_records(state.cleaned_data, columns, 1)
+        }
+
+        prompt = f"""
+        You are a senior data analyst specializing in the {domain_info["domain"]} domain.
+
+        Design a DASHBOARD tailored to this domain.
+
+        {self._dashboard_constraints()}
 
         Return ONLY valid JSON:
         {{
@@ -207,10 +494,11 @@ class AnalyticsAgent:
         }}
 
         Context:
-        {json.dumps(context, indent=2)}
+        {compact_json(context)}
         """
 
         # print("Plan Visualizations Prompt:", prompt)
+        self._log_prompt(state, 'plan_visualizations', prompt)
         
         response = self.llm_client.chat.completions.create(
             model="gpt-4o",
@@ -220,12 +508,132 @@ class AnalyticsAgent:
         )
 
         results = self._extract_json(response.choices[0].message.content)
+        return self._sort_charts(results)
+
+    @staticmethod
+    def _fused_response_format() -> dict:
+        """Structured output schema of the single-call mode: domain info and charts"""
+        nullable_string = {"type": ["string", "null"]}
+        chart = {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "type": {"type": "string", "enum": list(CHART_TYPES)},
+                "x": nullable_string,
+                "y": nullable_string,
+                "aggregation": {"type": ["string", "null"], "enum": ["mean", "sum", "count", None]},
+                "title": {"type": "string"},
+                "reason": {"type": "string"},
+                "priority": {"type": "number"},
+            },
+            "required": ["id", "type", "x", "y", "aggregation", "title", "reason", "priority"],
+            "additionalProperties": False,
+        }
+        domain = {
+            "type": "object",
+            "properties": {
+                "domain": {"type": "string"},
+                "confidence": {"type": "number"},
+                "dashboard_focus": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["domain", "confidence", "dashboard_focus"],
+            "additionalProperties": False,
+        }
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "dashboard_plan",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "domain_info": domain,
+                        "charts": {"type": "array", "items": chart},
+                    },
+                    "required": ["domain_info", "charts"],
+                    "additionalProperties": False,
+                },
+            },
+        }
 
-        # bring all single_value charts to the front
-        if "charts" in results:
-            results["charts"].sort(key=lambda x: 0 if x["type"] == "single_value" else 1)
+    def _classify_and_plan(self, state: AnalyticsState):
+        """Single-call mode: identify the domain and design the dashboard in one structured response"""
+        analysis_context, columns = self._analysis_context(state)
+        context = {
+            "columns": columns,
+            "sample_data": self._sample_records(state.cleaned_data, columns, PROMPT_SAMPLE_ROWS),
+            **analysis_context,
+        }
 
-        return results
+        prompt = f"""
+        You are a senior data analyst.
+
+        First identify the DOMAIN of the dataset (domain, confidence, dashboard_focus).
+        Then design a DASHBOARD tailored to this domain.
+
+        {self._dashboard_constraints()}
+
+        Chart x and y are original column names or null.
+        Return the domain info and the charts as JSON.
+
+        Context:
+        {compact_json(context)}
+        """
+        self._log_prompt(state, 'classify_and_plan', prompt)
+
+        response = self.llm_client.chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            response_format=self._fused_response_format(),
+        )
+
+        content = response.choices[0].message.content
+        try:
+            results = json.loads(content)
+        except (TypeError, json.JSONDecodeError):
+            # refusals and truncated responses are not valid JSON
+            print("Structured response could not be parsed, falling back to JSON extraction")
+            results = self._extract_json(content or "")
+        domain_info = results.pop("domain_info", {})
+        return domain_info, self._sort_charts(results)
+
+    def _validate_plan(self, df: pd.DataFrame, plan: dict) -> bool:
+        """Check that every chart of a cached plan can be drawn from this frame"""
+        charts = plan.get("charts")
+        if not charts:
+            return False
+        numeric_cols = set(df.select_dtypes(include=[np.number]).columns)
+        for chart in charts:
+            for key in ("x", "y"):
+                col = chart.get(key)
+                if col is not None and col not in df.columns:
+                    return False
+            if chart.get("aggregation") in ("mean", "sum") and chart.get("y") not in numeric_cols:
+                return False
+        return True
+
+    def _load_cached_plan(self, state: AnalyticsState, signature: str) -> bool:
+        if self.plan_cache is None:
+            return False
+        cached = self.plan_cache.get(signature)
+        if cached is None:
+            return False
+        if self.revalidate_plan and not self._validate_plan(state.cleaned_data, cached["visualization_plan"]):
+            print("Cached plan does not fit the new data, replanning")
+            return False
+        state.domain_info = copy.deepcopy(cached["domain_info"])
+        state.visualization_plan = copy.deepcopy(cached["visualization_plan"])
+        return True
+
+    def _store_plan(self, state: AnalyticsState, signature: str):
+        if self.plan_cache is None or not state.visualization_plan.get("charts"):
+            return
+        self.plan_cache.set(signature, {
+            "domain_info": copy.deepcopy(state.domain_info),
+            "visualization_plan": copy.deepcopy(state.visualization_plan),
+        })
 
     # self is instance of AnalyticsAgent
     def _extract_json(self, content):
@@ -264,8 +672,22 @@ class AnalyticsAgent:
             print(f"Unexpected error while extracting JSON: {e}")
             return {}
         
+    @staticmethod
+    def _timed(timings: dict, name: str, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[name] = round(time.perf_counter() - start, 3)
+
     """Main analysis pipeline"""
     def analyze_data(self, state: AnalyticsState):
+        """
+        Tasks run as a small DAG on a thread pool: domain classification (LLM) only needs
+        the columns and a few rows, so it is in flight while statistics, correlations and
+        categorical insights are computed; the visualization plan waits for all of them.
+        In fused mode a single call after the CPU tasks returns domain and plan together.
+        """
         try:
             if state.cleaned_data is None:
                 state.error = "No cleaned data provided"
@@ -273,29 +695,50 @@ class AnalyticsAgent:
                 return state
             
             df = state.cleaned_data
-            
-            # Calculate statistics
-            state.statistics = self._calculate_statistics(df)
-            
-            # Generate insights
-            insights = {}
-            insights['correlations'] = self._identify_correlations(df)
-            insights['categorical'] = self._generate_categorical_insights(df)
-            insights['data_quality'] = {
-                'total_rows': len(df),
-                'total_columns': len(df.columns),
-                'missing_values': int(df.isnull().sum().sum()),
-                'completeness': float((1 - df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100),
-            }
-            
-            state.insights = insights
+            timings = state.timings
+            start = time.perf_counter()
+
+            # reuse domain info and plan of a dataset with the same schema
+            signature = self._timed(timings, 'schema_signature', schema_signature, df)
+            plan_cached = self._load_cached_plan(state, signature)
+            if plan_cached:
+                print(f"Plan cache hit: {signature[:12]}, skipping LLM calls")
+
+            with ThreadPoolExecutor(max_workers=ANALYTICS_MAX_WORKERS, thread_name_prefix="analytics") as pool:
+                if not plan_cached and not self.fused_llm_call:
+                    domain = pool.submit(self._timed, timings, 'classify_domain', self._classify_domain, state)
+                correlations = pool.submit(self._timed, timings, 'correlations', self._identify_correlations, df)
+                categorical = pool.submit(
+                    self._timed, timings, 'categorical', self._generate_categorical_insights, df, state.sketches
+                )
+
+                # Calculate statistics, reusing the cleaning agent's profile when it still fits
+                state.profile = self._timed(timings, 'profile', ensure_profile, df, state.profile)
+                state.statistics = self._calculate_statistics(df, state.profile)
+
+                # Generate insights
+                state.insights = {
+                    'correlations': correlations.result(),
+                    'categorical': categorical.result(),
+                    'data_quality': self._data_quality(state),
+                }
 
-            # generate domain info
-            state.domain_info = self._classify_domain(state)
+                if not plan_cached and not self.fused_llm_call:
+                    state.domain_info = domain.result()
 
-            # generate visualization plan
-            state.visualization_plan = self._plan_visualizations(state, state.domain_info)
+            if not plan_cached and self.fused_llm_call:
+                state.domain_info, state.visualization_plan = self._timed(
+                    timings, 'classify_and_plan', self._classify_and_plan, state
+                )
+                self._store_plan(state, signature)
+            elif not plan_cached:
+                # generate visualization plan
+                state.visualization_plan = self._timed(
+                    timings, 'plan_visualizations', self._plan_visualizations, state, state.domain_info
+                )
+                self._store_plan(state, signature)
 
+            timings['total'] = round(time.perf_counter() - start, 3)
             state.status = "completed"
             
         except Exception as e:
@@ -314,6 +757,8 @@ class AnalyticsAgent:
             'statistics': state.statistics,
             'domain_info': state.domain_info,
             'visualization_plan': state.visualization_plan,
+            'timings': state.timings,
+            'prompt_tokens': state.prompt_tokens,
             'status': state.status,
         }
 
@@ -1,3 +1,3 @@
-from .__main__ import CleaningAgent, CleaningState
+from .__main__ import CleaningAgent, CleaningState, DuplicateFilter, MISSING_STRATEGIES, standardize_column_name, detect_datetime_format
 
-__all__ = ["CleaningAgent", "CleaningState"]
+__all__ = ["CleaningAgent", "CleaningState", "DuplicateFilter", "MISSING_STRATEGIES", "standardize_column_name", "detect_datetime_format"]
@@ -1,7 +1,179 @@
 
 from typing import Optional
+import threading
+import tracemalloc
+from contextlib import contextmanager
 import pandas as pd
 import numpy as np
+from CFG import (
+    CLEANING_TRACK_MEMORY,
+    CLEANING_MISSING_STRATEGY,
+    CLEANING_COLUMN_STRATEGIES,
+    NUMERIC_THRESHOLD,
+    NUMERIC_SAMPLE_SIZE,
+)
+from profiling import profile_frame
+
+
+# characters dropped when parsing formatted numbers: currency symbols, thousands separators, spaces, %
+CURRENCY_SYMBOLS = r"[$€£¥₹]|USD|EUR|GBP"
+CURRENCY_CHARS = r"[\s,%]|" + CURRENCY_SYMBOLS
+
+
+# candidate formats for date columns, the first one that parses every sampled value wins
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%d-%m-%Y",
+    "%m-%d-%Y",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%Y/%m/%d",
+    "%d.%m.%Y",
+]
+
+
+def detect_datetime_format(values: pd.Series, formats: Optional[list] = None) -> Optional[str]:
+    """Date format (of formats, default DATE_FORMATS) matching all non-null string values of a sample"""
+    values = values.dropna().astype(str).str.strip()
+    # dates need digits and a separator, skips plain words and numbers early
+    if values.empty or not values.str.match(r"^\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}").all():
+        return None
+    for fmt in formats or DATE_FORMATS:
+        parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+        if parsed.notna().all():
+            return fmt
+    return None
+
+
+# Missing value strategies: each fill function takes a column and returns it filled.
+# "drop" has no function, rows with a missing value in such a column are removed.
+def _fill_mode(col: pd.Series) -> pd.Series:
+    mode = col.mode(dropna=True)
+    return col.fillna(mode.iloc[0]) if len(mode) else col
+
+
+def _fill_mean(col: pd.Series) -> pd.Series:
+    # non-numeric columns have no mean, use the most frequent value
+    if not pd.api.types.is_numeric_dtype(col):
+        return _fill_mode(col)
+    return col.fillna(col.mean())
+
+
+def _fill_median(col: pd.Series) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(col):
+        return _fill_mode(col)
+    return col.fillna(col.median())
+
+
+MISSING_STRATEGIES = {
+    "drop": None,
+    "mean": _fill_mean,
+    "median": _fill_median,
+    "mode": _fill_mode,
+    "ffill": lambda col: col.ffill(),
+    "none": lambda col: col,  # keep missing values
+}
+
+# names used by earlier versions of handle_missing_values
+_STRATEGY_ALIASES = {"fill_mean": "mean", "fill_forward": "ffill"}
+
+
+class DuplicateFilter:
+    """
+    Hash-based duplicate row detection that works chunk by chunk.
+    Rows are reduced to 64-bit hashes, so memory is 8 bytes per distinct row seen
+    instead of the rows themselves. Filters of separately read chunks can be merged.
+    The hashes are kept in sorted runs, each at least twice the size of the next: a chunk
+    only sorts its own hashes, and runs are merged like a binary counter, so a file costs
+    O(n log n) instead of re-sorting everything seen for every chunk.
+    """
+
+    def __init__(self):
+        self._runs = []  # sorted, disjoint uint64 arrays, largest first
+
+    @staticmethod
+    def _hash_rows(chunk: pd.DataFrame) -> np.ndarray:
+        """
+        64-bit hash per row. Hashes depend on the dtype, so integer and boolean columns are
+        hashed as float64: a chunk where a missing value turned the column into floats still
+        matches the rows of earlier chunks (integers beyond 2**53 keep their dtype, floats
+        cannot hold them exactly).
+        """
+        as_float = {}
+        for col, values in chunk.items():
+            if pd.api.types.is_bool_dtype(values) or (pd.api.types.is_integer_dtype(values) and (
+                    values.empty or (values.min() > -2 ** 53 and values.max() < 2 ** 53))):
+                as_float[col] = np.float64
+        if as_float:
+            chunk = chunk.astype(as_float)
+        return pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+    def _contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, hashes).clip(max=len(run) - 1)
+            found |= run[pos] == hashes
+        return found
+
+    def _add(self, hashes: np.ndarray):
+        """Add hashes that are not in any run yet"""
+        if not len(hashes):
+            return
+        self._runs.append(np.unique(hashes))
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            last = self._runs.pop()
+            # runs are disjoint, so merging is a plain sort
+            self._runs[-1] = np.sort(np.concatenate([self._runs[-1], last]))
+
+    def mark(self, chunk: pd.DataFrame, remember: bool = True) -> np.ndarray:
+        """Boolean array, True for rows seen before (in this chunk or in earlier ones)"""
+        hashes = self._hash_rows(chunk)
+        duplicated = pd.Series(hashes).duplicated().to_numpy()
+        duplicated |= self._contains(hashes)
+        if remember:
+            self._add(hashes[~duplicated])
+        return duplicated
+
+    def merge(self, other: "DuplicateFilter"):
+        for run in other._runs:
+            self._add(run[~self._contains(run)])
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+
+_trace_lock = threading.Lock()
+
+@contextmanager
+def track_peak_memory(report: dict):
+    """
+    Record the peak memory allocated inside the block as report['peak_memory_mb'].
+    tracemalloc is process-wide, so only one cleaning run is measured at a time;
+    concurrent runs report None.
+    """
+    if not CLEANING_TRACK_MEMORY or not _trace_lock.acquire(blocking=False):
+        report['peak_memory_mb'] = None
+        yield
+        return
+    try:
+        if tracemalloc.is_tracing():
+            report['peak_memory_mb'] = None
+            yield
+            return
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report['peak_memory_mb'] = round(peak / 1024 / 1024, 2)
+    finally:
+        _trace_lock.release()
+
+
+def standardize_column_name(name) -> str:
+    return name.lower().strip().replace(' ', '_')
 
 
 class CleaningState:
@@ -11,59 +183,201 @@ class CleaningState:
         raw_data: Optional[pd.DataFrame] = None,
         cleaned_data: Optional[pd.DataFrame] = None,
         cleaning_report: Optional[dict] = None,
+        profile=None,
         error: Optional[str] = None,
         status: str = "pending",
+        missing_strategy: Optional[str] = None,
+        column_strategies: Optional[dict] = None,
+        date_formats: Optional[dict] = None,
     ):
         self.raw_data = raw_data
+        # per-request overrides of the agent's missing value strategies
+        self.missing_strategy = missing_strategy
+        self.column_strategies = column_strategies if column_strategies is not None else {}
+        # column -> date format for this upload: given formats are tried first, detected ones are added
+        self.date_formats = date_formats if date_formats is not None else {}
         self.cleaned_data = cleaned_data
         self.cleaning_report = cleaning_report if cleaning_report is not None else {}
+        # profiling.Profile of cleaned_data, reused by the analytics agent
+        self.profile = profile
         self.error = error
         self.status = status
 
 
 class CleaningAgent:
+    """
+    Ownership contract: the cleaning steps modify the frame they are given instead of
+    copying it, and clean_data takes over state.raw_data (it is set to None).
+    Callers must not use the raw frame after cleaning.
+    """
+
+    def __init__(self, missing_strategy: str = CLEANING_MISSING_STRATEGY, column_strategies: Optional[dict] = None):
+        self.missing_strategies = dict(MISSING_STRATEGIES)
+        self.missing_strategy = missing_strategy
+        self.column_strategies = column_strategies if column_strategies is not None else dict(CLEANING_COLUMN_STRATEGIES)
+
+    def register_missing_strategy(self, name: str, fill_fn):
+        """Add a strategy: fill_fn(column) returns the column with its missing values handled"""
+        self.missing_strategies[name] = fill_fn
+
+    def _resolve_strategy(self, name: str) -> str:
+        name = _STRATEGY_ALIASES.get(name, name)
+        if name not in self.missing_strategies:
+            raise ValueError(f"Unknown missing value strategy: {name}")
+        return name
+
+    @staticmethod
+    def _take_rows(df: pd.DataFrame, keep: np.ndarray) -> pd.DataFrame:
+        """Keep the rows where keep is True; no copy when nothing is removed"""
+        if keep.all():
+            return df
+        return df.take(np.flatnonzero(keep))
+
+    def _apply_missing_strategies(self, df: pd.DataFrame, strategies: dict, skip_rows: np.ndarray = None):
+        """
+        Handle missing values column by column. strategies maps column -> strategy name.
+        Rows marked in skip_rows (e.g. duplicates) are removed in the same row selection.
+        Returns (df, missing values before).
+        """
+        drop_rows = np.zeros(len(df), dtype=bool) if skip_rows is None else skip_rows.copy()
+        kept = ~drop_rows
+        missing_before = 0
+        fill_cols = []
+        for col in df.columns:
+            missing = df[col].isna().to_numpy()
+            n_missing = int(missing[kept].sum())
+            if not n_missing:
+                continue
+            missing_before += n_missing
+            if strategies[col] == "drop":
+                drop_rows |= missing
+            else:
+                fill_cols.append(col)
+
+        df = self._take_rows(df, ~drop_rows)
+
+        for col in fill_cols:
+            df[col] = self.missing_strategies[strategies[col]](df[col])
+        return df, missing_before
     
     def handle_missing_values(self, df: pd.DataFrame, strategy: str = 'drop'):
 
-        df = df.copy()
-        
-        if strategy == 'drop':
-            df = df.dropna()
-        elif strategy == 'fill_mean':
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
-        elif strategy == 'fill_forward':
-            df = df.fillna(method='ffill')
-        
+        strategy = self._resolve_strategy(strategy)
+        df, _ = self._apply_missing_strategies(df, {col: strategy for col in df.columns})
         return df
     
     def remove_duplicates(self, df: pd.DataFrame):
 
-        initial_len = len(df)
-        df = df.drop_duplicates()
-        duplicates_removed = initial_len - len(df)
-        return df, duplicates_removed
+        duplicated = DuplicateFilter().mark(df, remember=False)
+        df = self._take_rows(df, ~duplicated)
+        return df, int(duplicated.sum())
     
     def standardize_columns(self, df: pd.DataFrame):
 
-        df.columns = [col.lower().strip().replace(' ', '_') for col in df.columns]
+        df.columns = [standardize_column_name(col) for col in df.columns]
         return df
     
-    """Convert object to numeric where possible"""
-    def convert_data_types(self, df: pd.DataFrame):
+    @staticmethod
+    def _parse_numeric(values: pd.Series, formatted: Optional[bool] = None):
+        """
+        Parse strings as numbers in bulk. Plain numbers first; if that fails for most values,
+        currency and percent formatting ($1,234 / 1 234 € / 12%) is stripped and parsing retried.
+        Returns (numbers, kind, formatted) with kind 'numeric', 'currency' or 'percent' and
+        formatted whether formatting was stripped; pass formatted back to parse a whole column
+        the same way as its sample.
+        """
+        if not formatted:
+            numbers = pd.to_numeric(values, errors='coerce')
+            if formatted is False or numbers.notna().sum() >= values.notna().sum() * NUMERIC_THRESHOLD:
+                return numbers, 'numeric', False
+
+        text = values.astype(str)
+        if text.str.contains('%', regex=False).mean() > 0.5:
+            kind = 'percent'
+        elif text.str.contains(CURRENCY_SYMBOLS).mean() > 0.5:
+            kind = 'currency'
+        else:
+            kind = 'numeric'  # thousands separators only
+        # accounting negatives: (1,234) -> -1234
+        text = text.str.replace(r'^\s*\((.*)\)\s*$', r'-\1', regex=True)
+        text = text.str.replace(CURRENCY_CHARS, '', regex=True)
+        return pd.to_numeric(text, errors='coerce'), kind, True
+
+    def _coerce_column(self, col: pd.Series):
+        """Numeric version of col and its conversion kind, or (None, None) if it is not numeric"""
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            # parse each distinct value once and map through the codes
+            categories = pd.Series(col.cat.categories.astype(str))
+            parsed, kind, _ = self._parse_numeric(categories)
+            codes = col.cat.codes.to_numpy()
+            values = np.where(codes >= 0, parsed.to_numpy(dtype=float)[codes], np.nan)
+            numbers = pd.Series(values, index=col.index, name=col.name)
+        else:
+            # decide on a sample, only convert the whole column when the sample passes
+            sample = col.sample(n=NUMERIC_SAMPLE_SIZE, random_state=0) if len(col) > NUMERIC_SAMPLE_SIZE else col
+            parsed, kind, formatted = self._parse_numeric(sample)
+            if parsed.notna().sum() / max(len(sample), 1) <= NUMERIC_THRESHOLD:
+                return None, None
+            numbers, _, _ = self._parse_numeric(col, formatted)
+
+        if numbers.notna().sum() / max(len(numbers), 1) > NUMERIC_THRESHOLD:
+            return numbers, kind
+        return None, None
+
+    @staticmethod
+    def _date_format(name: str, sample: pd.Series, date_formats: dict) -> Optional[str]:
+        """Format of a date column from a sample, the known format of the column is checked first"""
+        known = date_formats.get(name)
+        if known is not None and detect_datetime_format(sample, formats=[known]) is not None:
+            return known
+        fmt = detect_datetime_format(sample)
+        if fmt is not None:
+            date_formats[name] = fmt
+        return fmt
+
+    def _coerce_dates(self, col: pd.Series, date_formats: dict):
+        """Datetime version of col and its format, or (None, None) if it does not hold dates"""
+        values = col.dropna()
+        sample = values.sample(n=NUMERIC_SAMPLE_SIZE, random_state=0) if len(values) > NUMERIC_SAMPLE_SIZE else values
+        fmt = self._date_format(col.name, sample, date_formats)
+        if fmt is None:
+            return None, None
+
+        # parse each distinct value once with the fixed format (no per-element inference)
+        # and map through the codes, code -1 (missing) picks the NaT appended last
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            codes, distinct = col.cat.codes.to_numpy(), col.cat.categories
+        else:
+            codes, distinct = pd.factorize(col)
+        parsed = pd.to_datetime(pd.Series(distinct).astype(str).str.strip(), format=fmt, errors='coerce')
+        values = np.append(parsed.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT', 'ns'))[codes]
+        dates = pd.Series(values, index=col.index, name=col.name)
+
+        if dates.notna().sum() >= col.notna().sum() * NUMERIC_THRESHOLD:
+            return dates, fmt
+        return None, None
+
+    """Convert object to datetime or numeric where possible"""
+    def convert_data_types(self, df: pd.DataFrame, date_formats: Optional[dict] = None):
 
         conversions = {}
-        df = df.copy()
+        date_formats = date_formats if date_formats is not None else {}
         
         for col in df.columns:
-            if df[col].dtype == 'object':
+            if df[col].dtype == 'object' or isinstance(df[col].dtype, pd.CategoricalDtype):
                 try:
-                    temp = pd.to_numeric(df[col], errors='coerce')
-                    if temp.notna().sum() / len(temp) > 0.8:  # If >80% can be converted
-                        df[col] = temp
-                        conversions[col] = 'numeric'
-                except:
-                    pass
+                    dates, fmt = self._coerce_dates(df[col], date_formats)
+                    if dates is not None:
+                        df[col] = dates
+                        conversions[col] = f'datetime ({fmt})'
+                        continue
+                    numbers, kind = self._coerce_column(df[col])
+                except (ValueError, TypeError) as e:
+                    print(f"Could not convert column {col}: {e}")
+                    continue
+                if numbers is not None:
+                    df[col] = numbers
+                    conversions[col] = kind
         
         return df, conversions
     
@@ -75,31 +389,31 @@ class CleaningAgent:
                 state.status = "failed"
                 return state
             
-            df = state.raw_data.copy()
+            # take ownership of the raw frame, every step below works on it in place
+            df = state.raw_data
+            state.raw_data = None
             initial_shape = df.shape
             report = {}
-            
+
             # Standardize column names
             df = self.standardize_columns(df)
-            
-            # Remove duplicates
-            df, dup_count = self.remove_duplicates(df)
-            report['duplicates_removed'] = dup_count
-            
-            # Handle missing values
-            missing_before = df.isnull().sum().sum()
-            df = self.handle_missing_values(df, strategy='drop')
-            report['missing_values_before'] = int(missing_before)
-            report['missing_values_after'] = int(df.isnull().sum().sum())
-            
-            # Convert data types
-            df, conversions = self.convert_data_types(df)
-            report['data_type_conversions'] = conversions
-
-            # Remove leading and trailing whitespace from string columns
-            str_cols = df.select_dtypes(include=['object']).columns
-            for col in str_cols:
-                df[col] = df[col].str.strip()
+
+            # per-request settings take precedence over the agent defaults
+            default = self._resolve_strategy(state.missing_strategy or self.missing_strategy)
+            column_strategies = {**self.column_strategies, **state.column_strategies}
+            strategies = {
+                col: self._resolve_strategy(column_strategies.get(col, default))
+                for col in df.columns
+            }
+
+            with track_peak_memory(report):
+                df = self._clean(df, report, strategies, state.date_formats)
+                # profile the cleaned frame once, null counts include values that failed type conversion
+                state.profile = profile_frame(df)
+
+            report['data_memory_mb'] = round(df.memory_usage(deep=False).sum() / 1024 / 1024, 2)
+
+            report['missing_values_after'] = state.profile.total_missing
             
             # Data shape information
             report['initial_shape'] = initial_shape
@@ -115,6 +429,32 @@ class CleaningAgent:
             state.status = "failed"
         
         return state
+
+    def _clean(self, df: pd.DataFrame, report: dict, strategies: dict, date_formats: dict) -> pd.DataFrame:
+        
+        # Remove duplicates and handle missing values with a single row selection
+        duplicated = DuplicateFilter().mark(df, remember=False)
+        df, missing_before = self._apply_missing_strategies(df, strategies, skip_rows=duplicated)
+        report['duplicates_removed'] = int(duplicated.sum())
+        report['missing_values_before'] = missing_before
+        report['missing_strategies'] = {
+            col: name for col, name in strategies.items() if name != 'drop'
+        }
+        
+        # Convert data types
+        df, conversions = self.convert_data_types(df, date_formats)
+        report['data_type_conversions'] = conversions
+
+        # Remove leading and trailing whitespace from string columns
+        str_cols = df.select_dtypes(include=['object']).columns
+        for col in str_cols:
+            df[col] = df[col].str.strip()
+
+        # Drop categories whose rows were all removed (columns typed as category at ingestion)
+        for col in df.select_dtypes(include=['category']).columns:
+            df[col] = df[col].cat.remove_unused_categories()
+
+        return df
     
     def get_cleaning_summary(self, state: CleaningState):
 
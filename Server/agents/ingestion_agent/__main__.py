@@ -1,29 +1,72 @@
 
-from typing import Optional
+from typing import Optional, Any
+import io
+import os
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from streams import open_source
+from agents.cleaning_agent import DuplicateFilter, detect_datetime_format
+from sketches import CategoricalSketch
+from CFG import (
+    INGESTION_MEMORY_BUDGET_MB,
+    INGESTION_CHUNK_ROWS,
+    INGESTION_SAMPLE_ROWS,
+    INGESTION_SNIFF_ROWS,
+    INGESTION_CATEGORY_RATIO,
+    SKETCH_PRECISION,
+    SKETCH_CAPACITY,
+)
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
 
 
 class IngestionState:
 
     def __init__(
         self,
-        file_path: str,
+        file_path: Optional[str] = None,
         raw_data: Optional[pd.DataFrame] = None,
         metadata: dict = None,
         error: Optional[str] = None,
         status: str = "pending",
+        file_obj: Any = None,
+        file_format: Optional[str] = None,
     ):
-        self.file_path: str = file_path
+        self.file_path: Optional[str] = file_path
+        # in-memory input instead of file_path: binary file object, bytes or memoryview
+        self.file_obj: Any = file_obj
+        # extension of file_obj, e.g. ".csv"
+        self.file_format: Optional[str] = file_format
+        # in chunked mode raw_data is a bounded sample, metadata describes the whole file
         self.raw_data: Optional[pd.DataFrame] = raw_data
         self.metadata: dict = metadata if metadata is not None else {}
+        # chunked mode: {column: CategoricalSketch} of the string columns over the whole file
+        self.sketches: dict = {}
         self.error: Optional[str] = error
         self.status: str = status
 
 class IngestionAgent:
     
-    def __init__(self):
+    def __init__(
+        self,
+        memory_budget_mb: float = INGESTION_MEMORY_BUDGET_MB,
+        chunk_rows: int = INGESTION_CHUNK_ROWS,
+        sample_rows: int = INGESTION_SAMPLE_ROWS,
+        sniff_rows: int = INGESTION_SNIFF_ROWS,
+    ):
         self.supported_formats = ['.csv', '.xlsx', '.json', '.parquet']
+        self.sniff_rows = sniff_rows
+        self.csv_engine = "pyarrow" if _has_pyarrow() else "c"
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.chunk_rows = chunk_rows
+        self.sample_rows = sample_rows
     
     def validate_file(self, file_path: str) -> bool:
 
@@ -32,27 +75,177 @@ class IngestionAgent:
             return False
         return path.suffix.lower() in self.supported_formats
     
+    def _source_size(self, source) -> int:
+        """Size in bytes of a path, buffer or seekable file object, 0 if unknown"""
+        if isinstance(source, str):
+            return os.path.getsize(source)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return memoryview(source).nbytes
+        try:
+            pos = source.tell()
+            size = source.seek(0, io.SEEK_END)
+            source.seek(pos)
+            return size
+        except Exception:
+            return 0
+
+    def _sniff_dtypes(self, df: pd.DataFrame) -> dict:
+        """
+        Look at the first sniff_rows rows and decide how string columns should be typed:
+        {column: ("datetime", format)} or {column: ("category", None)}
+        """
+        sample = df.head(self.sniff_rows)
+
+        dtype_map = {}
+        for col in sample.select_dtypes(include=["object"]).columns:
+            fmt = detect_datetime_format(sample[col])
+            if fmt is not None:
+                dtype_map[col] = ("datetime", fmt)
+                continue
+            values = sample[col].dropna()
+            if len(values) and values.nunique() / len(values) <= INGESTION_CATEGORY_RATIO:
+                dtype_map[col] = ("category", None)
+        return dtype_map
+
+    def _apply_dtype_map(self, df: pd.DataFrame, dtype_map: dict) -> pd.DataFrame:
+        """Convert sniffed columns in one vectorized call each"""
+        for col, (kind, fmt) in dtype_map.items():
+            if col not in df.columns or df[col].dtype != object:
+                continue
+            if pd.api.types.infer_dtype(df[col], skipna=True) != "string":
+                # the pyarrow engine already turned ISO dates into date objects
+                if kind == "datetime":
+                    df[col] = pd.to_datetime(df[col], errors="coerce")
+                continue
+            values = df[col].str.strip()
+            if kind == "datetime":
+                df[col] = pd.to_datetime(values, format=fmt, errors="coerce")
+            elif kind == "category":
+                df[col] = values.astype("category")
+        return df
+
+    def _read_csv(self, source) -> pd.DataFrame:
+        df = pd.read_csv(source, engine=self.csv_engine)
+        return self._apply_dtype_map(df, self._sniff_dtypes(df))
+
+    def _merge_dtype(self, current, new):
+        if current == new:
+            return current
+        if pd.api.types.is_numeric_dtype(current) and pd.api.types.is_numeric_dtype(new):
+            return np.result_type(current, new)
+        return np.dtype(object)
+
+    def _load_csv_chunked(self, source, state: IngestionState):
+        """
+        Stream the CSV in chunks of chunk_rows: metadata is accumulated per chunk,
+        duplicate rows are dropped across chunks, raw_data keeps a uniform random
+        sample of sample_rows rows (in file order). String columns are summarized over
+        the whole file with mergeable sketches (unique count, top values).
+        """
+        rng = np.random.default_rng(0)
+        duplicates = DuplicateFilter()
+        n_duplicates = 0
+        n_rows = 0
+        dtypes = {}
+        missing = None
+        sample = None
+        sample_keys = np.empty(0)
+        sketches = {}
+
+        dtype_map = None
+
+        for chunk in pd.read_csv(source, chunksize=self.chunk_rows):
+            if dtype_map is None:
+                dtype_map = self._sniff_dtypes(chunk)
+            chunk.index = pd.RangeIndex(n_rows, n_rows + len(chunk))
+            n_rows += len(chunk)
+
+            # duplicates of rows from any earlier chunk are dropped before sampling
+            duplicated = duplicates.mark(chunk)
+            if duplicated.any():
+                n_duplicates += int(duplicated.sum())
+                chunk = chunk[~duplicated]
+
+            for col, dtype in chunk.dtypes.items():
+                dtypes[col] = self._merge_dtype(dtypes[col], dtype) if col in dtypes else dtype
+            for col in chunk.select_dtypes(include=["object"]).columns:
+                if dtype_map.get(col, (None,))[0] == "datetime":
+                    continue
+                if col not in sketches:
+                    sketches[col] = CategoricalSketch(SKETCH_PRECISION, SKETCH_CAPACITY)
+                # stripped like the cleaning agent does, so top values match the cleaned data
+                sketches[col].update(chunk[col].str.strip())
+            chunk_missing = chunk.isnull().sum()
+            missing = chunk_missing if missing is None else missing.add(chunk_missing, fill_value=0)
+
+            # bottom-k sampling: keep the rows with the smallest random keys
+            keys = rng.random(len(chunk))
+            candidates = chunk if sample is None else pd.concat([sample, chunk])
+            all_keys = np.concatenate([sample_keys, keys])
+            if len(candidates) > self.sample_rows:
+                keep = np.argpartition(all_keys, self.sample_rows)[:self.sample_rows]
+                candidates = candidates.iloc[keep]
+                all_keys = all_keys[keep]
+            sample, sample_keys = candidates, all_keys
+
+        sample = sample.sort_index()
+        # a column that changed type between chunks is normalized in the sample as well
+        for col, dtype in dtypes.items():
+            if sample[col].dtype != dtype:
+                sample[col] = sample[col].astype(dtype)
+
+        state.raw_data = self._apply_dtype_map(sample.reset_index(drop=True), dtype_map)
+        state.sketches = sketches
+        state.metadata = {
+            'shape': (n_rows, len(dtypes)),
+            'columns': list(dtypes.keys()),
+            'dtypes': dtypes,
+            'missing_values': {col: int(v) for col, v in missing.items()},
+            'chunked': True,
+            'duplicates_removed': n_duplicates,
+            'sample_rows': len(state.raw_data),
+        }
+
     """Main Pipeline to load data"""
     def load_data(self, state: IngestionState):
 
         try:
-            file_path = state.file_path
-            
-            if not self.validate_file(file_path):
-                state.error = f"File not found or format not supported: {file_path}"
-                state.status = "failed"
+            if state.file_obj is not None:
+                # parse straight from memory, no temp file
+                suffix = (state.file_format or '').lower()
+                if suffix not in self.supported_formats:
+                    state.error = f"Format not supported: {state.file_format}"
+                    state.status = "failed"
+                    return state
+                size = self._source_size(state.file_obj)
+                source = open_source(state.file_obj)
+            else:
+                file_path = state.file_path
+
+                if not self.validate_file(file_path):
+                    state.error = f"File not found or format not supported: {file_path}"
+                    state.status = "failed"
+                    return state
+
+                suffix = Path(file_path).suffix.lower()
+                size = self._source_size(file_path)
+                source = file_path
+
+            # files above the memory budget are streamed instead of loaded whole
+            if suffix == '.csv' and size > self.memory_budget:
+                print(f"File of {size / 1024 / 1024:.0f} MB exceeds the memory budget, using chunked ingestion")
+                self._load_csv_chunked(source, state)
+                state.status = "completed"
                 return state
             
-            suffix = Path(file_path).suffix.lower()
-            
             if suffix == '.csv':
-                state.raw_data = pd.read_csv(file_path)
+                state.raw_data = self._read_csv(source)
             elif suffix == '.xlsx':
-                state.raw_data = pd.read_excel(file_path)
+                state.raw_data = pd.read_excel(source)
             elif suffix == '.json':
-                state.raw_data = pd.read_json(file_path)
+                state.raw_data = pd.read_json(source)
             elif suffix == '.parquet':
-                state.raw_data = pd.read_parquet(file_path)
+                state.raw_data = pd.read_parquet(source)
             
             state.metadata = {
                 'shape': state.raw_data.shape,
@@ -74,7 +267,7 @@ class IngestionAgent:
             return {}
         
         return {
-            'total_rows': len(state.raw_data),
+            'total_rows': state.metadata.get('shape', state.raw_data.shape)[0],
             'total_columns': len(state.raw_data.columns),
             'columns': list(state.raw_data.columns),
             'data_types': state.raw_data.dtypes.to_dict(),
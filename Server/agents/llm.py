@@ -1,20 +1,305 @@
 import os
+import json
+import time
+import types
+import random
+import asyncio
+import weakref
+import threading
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from CFG import (
+    LLM_BACKEND,
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF,
+    LLM_MAX_CONNECTIONS,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_DEFAULT_COMPLETION_TOKENS,
+)
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about 4 characters per token for English and JSON"""
+    return len(text) // 4 + 1
+
+
+def _prompt_tokens(messages: list) -> int:
+    return estimate_tokens("".join(str(message.get("content", "")) for message in messages))
+
+
+def _request_tokens(kwargs: dict) -> int:
+    # what a call counts against the tokens-per-minute limit: prompt + expected completion
+    completion = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or LLM_DEFAULT_COMPLETION_TOKENS
+    return _prompt_tokens(kwargs.get("messages", [])) + completion
+
+
+class TokenBucket:
+    """Refills rate_per_minute units per minute up to one minute's worth; acquire waits for enough units"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount: float) -> float:
+        """Take amount units (may go negative) and return how long the caller has to wait"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, amount: float = 1):
+        wait = self._reserve(amount)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, amount: float = 1):
+        wait = self._reserve(amount)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """Process-wide requests and tokens per minute, shared by every client"""
+
+    def __init__(self, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens: int):
+        if self.requests is not None:
+            self.requests.acquire(1)
+        if self.tokens is not None:
+            self.tokens.acquire(tokens)
+
+    async def acquire_async(self, tokens: int):
+        if self.requests is not None:
+            await self.requests.acquire_async(1)
+        if self.tokens is not None:
+            await self.tokens.acquire_async(tokens)
+
+
+class LLMError(Exception):
+    """A call failed; retryable errors are retried with backoff before this is raised"""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: float = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class OpenAIBackend:
+    """
+    OpenAI chat completions over pooled HTTP clients: one for sync calls, and one per event
+    loop for async calls, since an async client only works on the loop it was first used on
+    """
+
+    def __init__(self, api_key: str = None, timeout: float = LLM_TIMEOUT, max_connections: int = LLM_MAX_CONNECTIONS):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+        # event loop -> AsyncOpenAI, entries go away with their loop (e.g. after asyncio.run)
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                import httpx
+                from openai import OpenAI
+                # retries are done by LLMClient, which also knows about the rate limiter
+                self._client = OpenAI(
+                    api_key=self.api_key,
+                    timeout=self.timeout,
+                    max_retries=0,
+                    http_client=httpx.Client(limits=self._limits(), timeout=self.timeout),
+                )
+            return self._client
+
+    def _get_async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                import httpx
+                from openai import AsyncOpenAI
+                client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    timeout=self.timeout,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(limits=self._limits(), timeout=self.timeout),
+                )
+                self._async_clients[loop] = client
+            return client
+
+    @staticmethod
+    def _translate(error: Exception) -> LLMError:
+        import openai
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+            return LLMError(str(error), retryable=True)
+        if isinstance(error, openai.APIStatusError):
+            retry_after = None
+            try:
+                retry_after = float(error.response.headers.get("retry-after"))
+            except (TypeError, ValueError, AttributeError):
+                pass
+            retryable = error.status_code == 429 or error.status_code >= 500
+            return LLMError(str(error), retryable=retryable, retry_after=retry_after)
+        return LLMError(str(error))
+
+    def complete(self, timeout: float = None, **kwargs):
+        try:
+            return self._get_client().chat.completions.create(timeout=timeout or self.timeout, **kwargs)
+        except Exception as e:
+            raise self._translate(e) from e
+
+    async def complete_async(self, timeout: float = None, **kwargs):
+        try:
+            return await self._get_async_client().chat.completions.create(timeout=timeout or self.timeout, **kwargs)
+        except Exception as e:
+            raise self._translate(e) from e
+
+
+# what FakeBackend answers without a responder: a generic domain and an empty dashboard
+FAKE_DOMAIN = {"domain": "general", "confidence": 0.0, "dashboard_focus": []}
+FAKE_PLAN = {"charts": []}
+
+
+def canned_response(messages, response_format=None, **kwargs) -> str:
+    """Smallest valid answer to each analytics prompt: domain, plan, or both in the single-call mode"""
+    if response_format is not None:
+        return json.dumps({"domain_info": FAKE_DOMAIN, **FAKE_PLAN})
+    prompt = str(messages[-1].get("content", "")) if messages else ""
+    return json.dumps(FAKE_DOMAIN if "DOMAIN of the dataset" in prompt else FAKE_PLAN)
+
+
+class FakeBackend:
+    """
+    Local backend for tests and benchmarks: responder(messages, **kwargs) returns the
+    message content, canned_response by default. Responses look like OpenAI responses
+    (choices[0].message.content, usage).
+    """
+
+    def __init__(self, responder=None, latency: float = 0.0):
+        self.responder = responder or canned_response
+        self.latency = latency
+        self.calls = []
+
+    def _response(self, kwargs: dict):
+        self.calls.append(kwargs)
+        content = self.responder(**kwargs)
+        usage = types.SimpleNamespace(
+            prompt_tokens=_prompt_tokens(kwargs.get("messages", [])),
+            completion_tokens=estimate_tokens(content),
+        )
+        message = types.SimpleNamespace(role="assistant", content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+    def complete(self, timeout: float = None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._response(kwargs)
+
+    async def complete_async(self, timeout: float = None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._response(kwargs)
+
+
+class LLMClient:
+    """
+    Chat completions with a per-call timeout, exponential-backoff retries on 429/5xx/timeouts
+    and a shared rate limiter. client.chat.completions.create(...) works like the OpenAI client,
+    await client.acreate(...) is the async interface.
+    """
+
+    def __init__(self, backend, limiter: RateLimiter = None, max_retries: int = LLM_MAX_RETRIES,
+                 retry_backoff: float = LLM_RETRY_BACKOFF, timeout: float = LLM_TIMEOUT):
+        self.backend = backend
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def _delay(self, error: LLMError, attempt: int) -> float:
+        if error.retry_after is not None:
+            return error.retry_after
+        # full jitter keeps concurrent dashboards from retrying in lockstep
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    def create(self, timeout: float = None, **kwargs):
+        tokens = _request_tokens(kwargs)
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire(tokens)
+            try:
+                return self.backend.complete(timeout=timeout or self.timeout, **kwargs)
+            except LLMError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                delay = self._delay(e, attempt)
+                print(f"LLM call failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    async def acreate(self, timeout: float = None, **kwargs):
+        tokens = _request_tokens(kwargs)
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                await self.limiter.acquire_async(tokens)
+            try:
+                return await self.backend.complete_async(timeout=timeout or self.timeout, **kwargs)
+            except LLMError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                delay = self._delay(e, attempt)
+                print(f"LLM call failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+_BACKENDS = {
+    "openai": OpenAIBackend,
+    "fake": FakeBackend,
+}
+
 _llm = None
-def get_llm_client():
+_llm_lock = threading.Lock()
+_limiter = RateLimiter()
+def get_llm_client() -> LLMClient:
+    """Process-wide client for the backend configured in CFG, all callers share its pool and limits"""
 
     global _llm
-    if _llm is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            api_key = os.environ.get("OPENAI_API_KEY")
-        _llm = OpenAI(api_key=api_key)
+    with _llm_lock:
+        if _llm is None:
+            if LLM_BACKEND not in _BACKENDS:
+                raise ValueError(f"Unknown LLM backend: {LLM_BACKEND}")
+            _llm = LLMClient(_BACKENDS[LLM_BACKEND](), limiter=_limiter)
     return _llm
 
+
+def set_llm_client(client: LLMClient):
+    """Replace the process-wide client, e.g. with LLMClient(FakeBackend(responder)) in tests"""
+
+    global _llm
+    with _llm_lock:
+        _llm = client
+
+
 if __name__ == "__main__":
     #Test LLM client
     llm_client = get_llm_client()
@@ -25,4 +310,4 @@ if __name__ == "__main__":
             {"role": "user", "content": "Hello, how can you assist me today?"}
         ]
     )
-    print(res.choices[0].message.content)
\ No newline at end of file
+    print(res.choices[0].message.content)
@@ -1,6 +1,11 @@
+import time
 from typing import Optional
+import numpy as np
 import pandas as pd
-from CFG import MAX_DENSITY, CSV_UNIT
+from CFG import MAX_DENSITY, DOWNSAMPLING, CSV_UNIT, PAYLOAD_FORMAT, VISUALIZATION_SHARED_GROUPBY
+from CFG import RESAMPLE_FREQUENCIES
+from payload import encode_values, date_strings
+from downsampling import downsample
 
 
 class VisualizationState:
@@ -10,98 +15,136 @@ class VisualizationState:
         cleaned_data: Optional[pd.DataFrame] = None,
         visualization_plan: Optional[dict] = None,
         visualizations: Optional[list] = None,
+        payload_format: str = PAYLOAD_FORMAT,
+        cube=None,
+        sample_scale: float = 1.0,
         error: Optional[str] = None,
         status: str = "pending",
     ):
         self.cleaned_data = cleaned_data
+        self.payload_format = payload_format
+        # rows of the whole file per row of cleaned_data, above 1 when chunked ingestion handed over
+        # a sample: sums and counts are scaled by it and marked "estimated"
+        self.sample_scale = sample_scale
+        # optional cube.AggregationCube of cleaned_data, grouped charts are answered from it
+        self.cube = cube
         self.visualization_plan = visualization_plan if visualization_plan is not None else {}
         self.visualizations = visualizations if visualizations is not None else []
         self.error = error
         self.status = status
+        self.timings: dict = {}
+
+# aggregations the grouped charts support, in pandas' names
+AGGREGATIONS = ("mean", "sum", "count")
+# aggregations that grow with the number of rows, scaled up when the data is a sample
+SCALED_AGGREGATIONS = ("sum", "count")
+
 
 class VisualizationAgent:
 
-    def _apply_aggregation(self, df: pd.DataFrame, spec: dict):
+    def __init__(self, shared_groupby: bool = VISUALIZATION_SHARED_GROUPBY):
+        self.shared_groupby = shared_groupby
+
+    @staticmethod
+    def _plan_queries(columns, chart_plans: list) -> dict:
+        """Query plan {x: {y: [aggregations]}}: one groupby per distinct x instead of one per chart"""
+        queries = {}
+        for spec in chart_plans:
+            x, y, agg = spec.get("x"), spec.get("y"), spec.get("aggregation")
+            if spec.get("type") == "single_value" or agg not in AGGREGATIONS:
+                continue
+            if x not in columns or y not in columns:
+                continue
+            aggs = queries.setdefault(x, {}).setdefault(y, [])
+            if agg not in aggs:
+                aggs.append(agg)
+        return queries
+
+    def _run_queries(self, df: pd.DataFrame, queries: dict, timings: dict, cube=None) -> dict:
+        """{x: frame indexed by x with (y, aggregation) columns}, keys that fail are left to the charts"""
+        grouped = {}
+        for x, aggregations in queries.items():
+            start = time.perf_counter()
+            try:
+                grouped[x] = _aggregate(df, x, aggregations, cube)
+            except Exception as e:
+                print(f"Shared groupby on {x} failed, charts aggregate on their own: {e}")
+            timings[f"groupby:{x}"] = round(time.perf_counter() - start, 4)
+        return grouped
+
+    def _apply_aggregation(self, df: pd.DataFrame, spec: dict, payload_format: str = "json",
+                           grouped: Optional[pd.DataFrame] = None, cube=None, sample_scale: float = 1.0):
 
         x = spec.get("x")
         y = spec.get("y")
         agg = spec.get("aggregation")
 
+        if df is None and (agg not in AGGREGATIONS or (spec.get("type") != "single_value" and not cube.covers(x, [y]))):
+            raise ValueError("Chart needs the data rows, it cannot be answered from the aggregation cube")
+
         if spec.get("type") == "single_value":
-            if agg == "mean":
-                value = round(df[y].mean(), 2)
-            elif agg == "sum":
-                value = round(df[y].sum(), 2)
-            elif agg == "count":
-                value = int(df[y].count())
-            else:
+            if agg not in AGGREGATIONS:
                 raise ValueError(f"Unsupported aggregation for single_value: {agg}")
+            value = df[y].agg(agg) if df is not None else cube.total(y, agg)
+            estimated = sample_scale != 1 and agg in SCALED_AGGREGATIONS
+            if estimated:
+                value = value * sample_scale
+            value = int(round(value)) if agg == "count" else round(value, 2)
 
             value = format_large_number(value)
             unit = CSV_UNIT.get(y, "")
+            result = {"value": value}
             if unit:
                 if unit.endswith("-"):
-                    return {"value": value, "unit": unit[:-1], "position": "prefix"}
-
-            return {"value": value}
+                    result = {"value": value, "unit": unit[:-1], "position": "prefix"}
+            if estimated:
+                result["estimated"] = True
+            return result
         
         if x is None or y is None:
             raise ValueError("Both 'x' and 'y' must be specified for non-single_value charts")
         
-        data = {}
         if agg is None or agg == "null":
-            data["x"] = df[x].tolist()
-            data["y"] = df[y].tolist()
-
-            # reduce density for scatter plots
-            if spec.get("type") == "scatter":
-                max_points = MAX_DENSITY
-                if len(data["x"]) > max_points:
-                    step = len(data["x"]) // max_points
-                    data["x"] = data["x"][::step]
-                    data["y"] = data["y"][::step]
-
-            return data     
-
-        if agg == "mean":
-            df_plot = df.groupby(x, as_index=False)[y].mean()
-            df_plot[y] = df_plot[y].round(2)
-            data["x"] = df_plot[x].tolist()
-            data["y"] = df_plot[y].tolist()
-        elif agg == "sum":
-            df_plot = df.groupby(x, as_index=False)[y].sum()
-            df_plot[y] = df_plot[y].round(2)
-            data["x"] = df_plot[x].tolist()
-            data["y"] = df_plot[y].tolist()
-        elif agg == "count":
-            df_plot = df.groupby(x, as_index=False)[y].count()
-            df_plot[y] = df_plot[y].round(2)
-            data["x"] = df_plot[x].tolist()
-            data["y"] = df_plot[y].tolist()
-        else:
+            xs, ys = _reduce_density(spec, df[x], df[y])
+            return _values(xs, ys, payload_format)
+
+        if agg not in AGGREGATIONS:
             raise ValueError(f"Unsupported aggregation: {agg}")
-        
-        # reduce density for line/bar charts
-        if spec.get("type") in ["line", "bar"]:
-            max_points = MAX_DENSITY
-            if len(data["x"]) > max_points:
-                step = len(data["x"]) // (max_points - 1) + 1
-                data["x"] = data["x"][::step]
-                data["y"] = data["y"][::step]
+        if grouped is None or (y, agg) not in grouped.columns:
+            grouped = _aggregate(df, x, {y: [agg]}, cube)
+        xs = pd.Series(grouped.index, name=x)
+        ys = grouped[(y, agg)].reset_index(drop=True)
+        estimated = sample_scale != 1 and agg in SCALED_AGGREGATIONS
+        if estimated:
+            ys = (ys * sample_scale).round().astype(np.int64) if agg == "count" else ys * sample_scale
+        ys = ys.round(2)
 
-        return data
+        xs, ys = _reduce_density(spec, xs, ys)
+        values = _values(xs, ys, payload_format)
+        if estimated:
+            values["estimated"] = True
+        return values
 
     def __call__(self, state: VisualizationState):
 
         try:
             charts = []
-            if state.cleaned_data is None:
+            if state.cleaned_data is None and state.cube is None:
                 raise ValueError("No cleaned data provided")
             df = state.cleaned_data
+            cube = state.cube
             chart_plans = state.visualization_plan.get("charts", [])
-            for spec in chart_plans:
+            timings = state.timings
+            start = time.perf_counter()
+            grouped = {}
+            if self.shared_groupby:
+                columns = df.columns if df is not None else cube.columns
+                grouped = self._run_queries(df, self._plan_queries(columns, chart_plans), timings, cube)
+            for i, spec in enumerate(chart_plans):
+                chart_start = time.perf_counter()
                 try:
-                    values = self._apply_aggregation(df, spec)
+                    values = self._apply_aggregation(df, spec, state.payload_format, grouped.get(spec.get("x")), cube,
+                                                     state.sample_scale)
                     # print("Chart type:", spec.get("type"))
                     # print("Chart Values:", values.keys())
                     # print('-' * 20)
@@ -111,6 +154,8 @@ class VisualizationAgent:
                     })
                 except Exception as e:
                     print(f"Error processing chart spec {spec}: {e}")
+                timings[f"chart:{spec.get('id', i + 1)}"] = round(time.perf_counter() - chart_start, 4)
+            timings["total"] = round(time.perf_counter() - start, 4)
             state.visualizations = charts
             state.status = "success"
 
@@ -121,6 +166,84 @@ class VisualizationAgent:
         return state
 
 
+def resample_frequency(values: pd.Series) -> Optional[str]:
+    """
+    Finest of RESAMPLE_FREQUENCIES with at most MAX_DENSITY periods between the first and last date,
+    None when the distinct dates already fit (weekly data keeps its own dates, not the Mondays of its weeks)
+    """
+    start, end = values.min(), values.max()
+    if not RESAMPLE_FREQUENCIES or pd.isna(start) or values.nunique() <= MAX_DENSITY:
+        return None
+    if start.tzinfo is not None:
+        start, end = start.tz_localize(None), end.tz_localize(None)
+    for freq in RESAMPLE_FREQUENCIES:
+        if (end.to_period(freq) - start.to_period(freq)).n + 1 <= MAX_DENSITY:
+            break
+    return freq
+
+
+def period_start(values: pd.Series, freq: str) -> pd.Series:
+    """First day of the day / week (from Monday) / month / quarter / year each date falls in"""
+    if values.dt.tz is not None:
+        values = values.dt.tz_localize(None)
+    # calendar units are slow to convert to, so convert the distinct days only
+    codes, days = pd.factorize(values.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]"))
+    if freq in ("M", "Y"):
+        start = days.astype(f"datetime64[{freq}]")
+    elif freq == "Q":
+        months = days.astype("datetime64[M]").astype(np.int64)
+        start = (months - months % 3).astype("datetime64[M]")
+    elif freq == "W":
+        # 1970-01-01 was a Thursday
+        day_numbers = days.astype(np.int64)
+        start = (day_numbers - (day_numbers + 3) % 7).astype("datetime64[D]")
+    else:
+        start = days
+    start = np.append(start.astype("datetime64[ns]"), np.datetime64("NaT", "ns"))
+    # code -1 (missing date) picks the NaT appended last
+    return pd.Series(start[codes], index=values.index, name=values.name)
+
+
+def _aggregate(df: pd.DataFrame, x: str, aggregations: dict, cube=None) -> pd.DataFrame:
+    """
+    df grouped by x and aggregated ({y: [aggregations]}), indexed by x with (y, aggregation)
+    columns. A datetime x is resampled to resample_frequency periods, labelled by their first day.
+    Flooring the dates and grouping on the result gives the same bins as resample / pd.Grouper
+    without their sort of the whole frame, which dominates on unsorted data.
+    With a cube covering x and the measures, the result comes from the cube instead of the rows.
+    """
+    if cube is not None and cube.covers(x, aggregations):
+        index = pd.Series(cube.tables[x].index)
+        freq = resample_frequency(index) if pd.api.types.is_datetime64_any_dtype(index) else None
+        return cube.aggregate(x, aggregations, period_start(index, freq) if freq else None)
+
+    freq = resample_frequency(df[x]) if pd.api.types.is_datetime64_any_dtype(df[x]) else None
+    if freq is None:
+        return df.groupby(x, observed=True).agg(aggregations)
+    return df.groupby(period_start(df[x], freq)).agg(aggregations)
+
+
+def _reduce_density(spec: dict, xs: pd.Series, ys: pd.Series) -> tuple:
+    """At most MAX_DENSITY points, thinned with the chart type's DOWNSAMPLING method"""
+    method = DOWNSAMPLING.get(spec.get("type"))
+    if method is None or len(xs) <= MAX_DENSITY:
+        return xs, ys
+    return downsample(xs, ys, MAX_DENSITY, method)
+
+
+def _values(xs: pd.Series, ys: pd.Series, payload_format: str) -> dict:
+    if payload_format == "compact":
+        return encode_values({"x": xs, "y": ys})
+    return {"x": _to_list(xs), "y": _to_list(ys)}
+
+
+def _to_list(series: pd.Series) -> list:
+    """JSON-friendly values, dates become ISO strings"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return date_strings(series).tolist()
+    return series.tolist()
+
+
 # Format big  number, eg: 1234 -> 1.2K 1234567 to 1.2M
 def format_large_number(num):
     for unit in ['', 'K', 'M', 'B', 'T']:
@@ -0,0 +1,150 @@
+
+import os
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from CFG import (
+    ARCHIVE_BACKEND,
+    ARCHIVE_MAX_WORKERS,
+    ARCHIVE_MAX_RETRIES,
+    ARCHIVE_RETRY_BACKOFF,
+    ARCHIVE_MAX_PENDING,
+    GCS_BUCKET_NAME,
+)
+from streams import MemoryviewReader
+
+
+LOCAL_ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), "uploads", "archive")
+
+
+class ArchiveBackend:
+
+    def uri_for(self, object_name: str) -> str:
+        raise NotImplementedError
+
+    def upload(self, source, object_name: str, content_type: str = None) -> str:
+        """Store source (local path or bytes-like buffer) durably under object_name and return its URI"""
+        raise NotImplementedError
+
+
+class GCSArchive(ArchiveBackend):
+    """Google Cloud Storage; one client and connection pool shared by all uploads"""
+
+    def __init__(self, bucket_name: str = GCS_BUCKET_NAME, pool_size: int = ARCHIVE_MAX_WORKERS):
+        if not bucket_name:
+            raise RuntimeError("Missing GCS bucket name")
+        self.bucket_name = bucket_name
+        self.pool_size = pool_size
+        self._bucket = None
+        self._lock = threading.Lock()
+
+    def _get_bucket(self):
+        with self._lock:
+            if self._bucket is None:
+                import google.auth
+                from google.auth.transport.requests import AuthorizedSession
+                from google.cloud import storage
+                from requests.adapters import HTTPAdapter
+
+                credentials, project = google.auth.default()
+                session = AuthorizedSession(credentials)
+                # keep one connection per archive worker alive
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                client = storage.Client(project=project, credentials=credentials, _http=session)
+                self._bucket = client.bucket(self.bucket_name)
+            return self._bucket
+
+    def uri_for(self, object_name: str) -> str:
+        return f"gs://{self.bucket_name}/{object_name}"
+
+    def upload(self, source, object_name: str, content_type: str = None) -> str:
+        blob = self._get_bucket().blob(object_name)
+        if isinstance(source, str):
+            blob.upload_from_filename(source, content_type=content_type)
+        else:
+            reader = MemoryviewReader(source)
+            blob.upload_from_file(reader, size=len(reader), content_type=content_type, rewind=True)
+        return self.uri_for(object_name)
+
+
+class LocalArchive(ArchiveBackend):
+    """Copies uploads into a local directory, stand-in for GCS in development and tests"""
+
+    def __init__(self, directory: str = LOCAL_ARCHIVE_DIR):
+        self.directory = directory
+
+    def uri_for(self, object_name: str) -> str:
+        return f"file://{os.path.abspath(os.path.join(self.directory, object_name))}"
+
+    def upload(self, source, object_name: str, content_type: str = None) -> str:
+        dest = os.path.join(self.directory, object_name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if isinstance(source, str):
+            shutil.copyfile(source, dest)
+        else:
+            with open(dest, "wb") as f:
+                f.write(source)
+        return self.uri_for(object_name)
+
+
+class Archiver:
+    """Runs archive uploads on a background pool with exponential-backoff retries"""
+
+    def __init__(self, backend: ArchiveBackend, max_workers: int = ARCHIVE_MAX_WORKERS,
+                 max_retries: int = ARCHIVE_MAX_RETRIES, retry_backoff: float = ARCHIVE_RETRY_BACKOFF,
+                 max_pending: int = ARCHIVE_MAX_PENDING):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="archive")
+        # every pending archive holds its upload (buffer or spool file) until it is done
+        self._pending = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, source, object_name: str, content_type: str = None) -> Future:
+        """
+        Start the upload of a local path or buffer; the future resolves to the URI or raises the last error.
+        Blocks while max_pending archives are in flight, so during a burst or a storage outage the
+        calling job keeps its JobManager slot (new uploads get 429s) instead of uploads piling up.
+        """
+        self._pending.acquire()
+        try:
+            future = self._executor.submit(self._upload_with_retry, source, object_name, content_type)
+        except Exception:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def _upload_with_retry(self, source, object_name: str, content_type: str = None) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.backend.upload(source, object_name, content_type)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Archive of {object_name} failed after {attempt + 1} attempts: {e}")
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                print(f"Archive of {object_name} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+_BACKENDS = {
+    "gcs": GCSArchive,
+    "local": LocalArchive,
+}
+
+_archiver = None
+_archiver_lock = threading.Lock()
+def get_archiver() -> Archiver:
+    """Process-wide archiver for the backend configured in CFG"""
+
+    global _archiver
+    with _archiver_lock:
+        if _archiver is None:
+            if ARCHIVE_BACKEND not in _BACKENDS:
+                raise ValueError(f"Unknown archive backend: {ARCHIVE_BACKEND}")
+            _archiver = Archiver(_BACKENDS[ARCHIVE_BACKEND]())
+    return _archiver
@@ -0,0 +1,101 @@
+"""
+Peak memory and time of CleaningAgent against the previous copy-per-step cleaning.
+
+    python benchmarks/bench_cleaning.py [rows]
+
+Runs on a synthetic frame (numeric, string and mostly-numeric string columns with
+duplicates and missing values) and on the files in "Test Samples CSV".
+Peak memory is measured with tracemalloc around the cleaning call only, in a separate
+run from the timing.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SAMPLES_DIR = os.path.join(SERVER_DIR, "..", "Test Samples CSV")
+REPEATS = 3
+sys.path.insert(0, SERVER_DIR)
+
+import CFG
+CFG.CLEANING_TRACK_MEMORY = False  # measured here instead
+from agents.cleaning_agent import CleaningAgent, CleaningState
+
+
+def legacy_clean(raw: pd.DataFrame) -> pd.DataFrame:
+    """The cleaning steps as they were before the copy-free rewrite"""
+    df = raw.copy()
+    df.columns = [col.lower().strip().replace(' ', '_') for col in df.columns]
+    df = df.drop_duplicates()
+    df = df.copy()
+    df = df.dropna()
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            temp = pd.to_numeric(df[col], errors='coerce')
+            if temp.notna().sum() / len(temp) > 0.8:
+                df[col] = temp
+    for col in df.select_dtypes(include=['object']).columns:
+        df[col] = df[col].str.strip()
+    return df
+
+
+def current_clean(raw: pd.DataFrame) -> pd.DataFrame:
+    state = CleaningAgent().clean_data(CleaningState(raw_data=raw))
+    if state.status != "completed":
+        raise RuntimeError(state.error)
+    return state.cleaned_data
+
+
+def synthetic_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        f"num_{i}": rng.normal(size=rows) for i in range(16)
+    })
+    df["label"] = rng.choice(["north ", "south", " east", "west"], size=rows)
+    df["amount"] = rng.integers(0, 1000, size=rows).astype(str)
+    df.loc[rng.random(rows) < 0.01, "num_0"] = np.nan
+    # 5% duplicated rows
+    return pd.concat([df, df.sample(frac=0.05, random_state=0)], ignore_index=True)
+
+
+def measure(fn, make_frame):
+    """Time without tracing (tracemalloc slows string operations down), then peak with tracing"""
+    data_mb = make_frame().memory_usage(deep=True).sum() / 1024 / 1024
+    times = []
+    for _ in range(REPEATS):
+        raw = make_frame()
+        start = time.perf_counter()
+        fn(raw)
+        times.append(time.perf_counter() - start)
+    elapsed = min(times)
+
+    raw = make_frame()
+    tracemalloc.start()
+    fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024, data_mb
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    cases = {f"synthetic ({rows} rows)": lambda: synthetic_frame(rows)}
+    for name in sorted(os.listdir(SAMPLES_DIR)):
+        if name.endswith(".csv"):
+            path = os.path.join(SAMPLES_DIR, name)
+            cases[name] = lambda path=path: pd.read_csv(path)
+
+    print(f"{'data':<45} {'mode':<8} {'ms':>8} {'peak MB':>9} {'data MB':>9} {'peak/data':>10}")
+    for name, make_frame in cases.items():
+        for mode, fn in (("legacy", legacy_clean), ("current", current_clean)):
+            ms, peak, data = measure(fn, make_frame)
+            print(f"{name:<45} {mode:<8} {ms:>8.1f} {peak:>9.1f} {data:>9.1f} {peak / data:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
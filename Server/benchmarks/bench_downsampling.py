@@ -0,0 +1,78 @@
+"""
+Downsampling methods (downsampling.py) on a long line series with spikes and on a scatter
+cloud with outliers, reduced to MAX_DENSITY points.
+
+    python benchmarks/bench_downsampling.py [points] [--max-points 200]
+
+line:     range kept (share of the original min..max the thinned series still spans) and
+          share of the 20 spikes kept
+scatter:  share of the outliers (beyond 4 standard deviations) and of the bounding box kept
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REPEATS = 5
+sys.path.insert(0, SERVER_DIR)
+
+from CFG import MAX_DENSITY
+from downsampling import DOWNSAMPLERS
+
+
+def timed(fn, *args) -> tuple:
+    runs = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        runs.append(time.perf_counter() - start)
+    return result, statistics.median(runs)
+
+
+def line_series(n: int, rng) -> tuple:
+    y = np.cumsum(rng.normal(size=n))
+    spikes = rng.choice(n, 20, replace=False)
+    y[spikes] += rng.choice([-1, 1], 20) * rng.uniform(50, 200, 20)
+    return np.arange(n, dtype=np.float64), y, spikes
+
+
+def scatter_cloud(n: int, rng) -> tuple:
+    x, y = rng.normal(size=n), rng.normal(size=n)
+    outliers = rng.choice(n, 50, replace=False)
+    x[outliers] *= 8
+    y[outliers] *= 8
+    return x, y
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("points", nargs="?", type=int, default=1_000_000)
+    parser.add_argument("--max-points", type=int, default=MAX_DENSITY)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    print(f"{args.points} points to at most {args.max_points}, median of {REPEATS}\n")
+
+    x, y, spikes = line_series(args.points, rng)
+    print(f"{'line':<10}{'ms':>8}{'points':>8}{'range kept':>12}{'spikes':>12}")
+    for name, fn in DOWNSAMPLERS.items():
+        index, seconds = timed(fn, x, y, args.max_points)
+        kept = y[index]
+        range_kept = (kept.max() - kept.min()) / (y.max() - y.min())
+        print(f"{name:<10}{seconds * 1000:>8.1f}{len(index):>8}{range_kept:>12.1%}{np.isin(spikes, index).mean():>12.1%}")
+
+    x, y = scatter_cloud(args.points, rng)
+    outliers = np.flatnonzero((np.abs(x) > 4) | (np.abs(y) > 4))
+    print(f"\n{'scatter':<10}{'ms':>8}{'points':>8}{'outliers':>12}{'box kept':>12}")
+    for name, fn in DOWNSAMPLERS.items():
+        index, seconds = timed(fn, x, y, args.max_points)
+        box = (np.ptp(x[index]) * np.ptp(y[index])) / (np.ptp(x) * np.ptp(y))
+        print(f"{name:<10}{seconds * 1000:>8.1f}{len(index):>8}"
+              f"{np.isin(outliers, index).mean():>12.1%}{box:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
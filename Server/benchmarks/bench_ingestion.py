@@ -0,0 +1,88 @@
+"""
+Parse time and memory of CSV ingestion on the files in "Test Samples CSV".
+
+    python benchmarks/bench_ingestion.py
+
+baseline: pd.read_csv with default dtypes + the old numeric re-parse of every object column
+sniffed:  IngestionAgent (dtype sniffing, pyarrow engine when installed)
+
+Every (mode, file) pair runs in a fresh interpreter so the peak RSS is not shared.
+"""
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SAMPLES_DIR = os.path.join(SERVER_DIR, "..", "Test Samples CSV")
+REPEATS = 5
+
+sys.path.insert(0, SERVER_DIR)
+
+
+def _baseline(path):
+    import pandas as pd
+    df = pd.read_csv(path)
+    for col in df.select_dtypes(include=["object"]).columns:
+        temp = pd.to_numeric(df[col], errors="coerce")
+        if temp.notna().sum() / len(temp) > 0.8:
+            df[col] = temp
+    return df
+
+
+def _sniffed(path):
+    from agents.ingestion_agent import IngestionAgent, IngestionState
+    state = IngestionAgent().load_data(IngestionState(file_path=path))
+    if state.status != "completed":
+        raise RuntimeError(state.error)
+    return state.raw_data
+
+
+MODES = {"baseline": _baseline, "sniffed": _sniffed}
+
+
+def run_one(mode, path):
+    """Child process: time the mode and report peak RSS growth in MB"""
+    # import everything before measuring, only parsing should count
+    import pandas  # noqa: F401
+    from agents.ingestion_agent import IngestionAgent  # noqa: F401
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        pass
+    fn = MODES[mode]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        df = fn(path)
+        times.append(time.perf_counter() - start)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "parse_ms": min(times) * 1000,
+        "peak_rss_mb": (rss_after - rss_before) / 1024,  # ru_maxrss is in KB on Linux
+        "frame_mb": df.memory_usage(deep=True).sum() / 1024 / 1024,
+    }))
+
+
+def main():
+    files = sorted(f for f in os.listdir(SAMPLES_DIR) if f.endswith(".csv"))
+    print(f"{'file':<45} {'mode':<9} {'parse ms':>9} {'peak RSS MB':>12} {'frame MB':>9}")
+    for name in files:
+        path = os.path.join(SAMPLES_DIR, name)
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, __file__, "--run", mode, path],
+                capture_output=True, text=True, check=True, cwd=SERVER_DIR,
+            )
+            res = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{name:<45} {mode:<9} {res['parse_ms']:>9.1f} {res['peak_rss_mb']:>12.1f} {res['frame_mb']:>9.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_one(sys.argv[2], sys.argv[3])
+    else:
+        main()
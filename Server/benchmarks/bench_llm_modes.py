@@ -0,0 +1,142 @@
+"""
+Latency and prompt tokens of the analytics stage: two LLM calls (domain, then plan)
+against the single structured-output call (ANALYTICS_FUSED_LLM_CALL).
+
+    python benchmarks/bench_llm_modes.py [csv file] [--time-scale 0.1]
+
+No API key is needed: the OpenAI client is replaced by a stub that answers with canned
+JSON and sleeps for a latency modeled from recorded gpt-4o round-trips
+(RECORDED_LATENCY, edit to match your own measurements). Tokens are counted with
+tiktoken when it is installed, otherwise estimated as characters / 4.
+"""
+import os
+import sys
+import json
+import time
+import types
+import argparse
+
+import pandas as pd
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_FILE = os.path.join(SERVER_DIR, "Walmart_Sales.csv")
+sys.path.insert(0, SERVER_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from agents.analytics_agent import AnalyticsAgent, AnalyticsState
+from agents.cleaning_agent import CleaningAgent, CleaningState
+
+# seconds = base + per prompt token + per completion token
+RECORDED_LATENCY = {
+    "base": 0.45,
+    "prompt_token": 0.00002,
+    "completion_token": 0.012,
+}
+
+
+def _token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        return lambda text: len(text) // 4
+
+
+count_tokens = _token_counter()
+
+
+def canned_plan(df: pd.DataFrame) -> list:
+    numeric = list(df.select_dtypes(include="number").columns)
+    other = [col for col in df.columns if col not in numeric] or numeric
+    charts = []
+    for i, (chart_type, x, y, agg) in enumerate([
+        ("single_value", None, numeric[0], "sum"),
+        ("single_value", None, numeric[-1], "mean"),
+        ("bar", other[0], numeric[0], "mean"),
+        ("line", other[0], numeric[-1], "sum"),
+        ("scatter", numeric[0], numeric[-1], None),
+        ("pie", other[-1], numeric[0], "sum"),
+    ]):
+        charts.append({
+            "id": str(i + 1), "type": chart_type, "x": x, "y": y, "aggregation": agg,
+            "title": f"{agg or 'raw'} of {y} by {x}", "priority": 1.0,
+            "reason": "Answers how the metric is distributed and supports where to focus effort.",
+        })
+    return charts
+
+
+class StubLLMClient:
+    """Stands in for openai.OpenAI: canned answers, modeled latency, token accounting"""
+
+    def __init__(self, charts: list, time_scale: float = 1.0):
+        self.charts = charts
+        self.time_scale = time_scale
+        self.calls = []
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=None, response_format=None, **kwargs):
+        prompt = "".join(message["content"] for message in messages)
+        domain = {"domain": "retail", "confidence": 0.9, "dashboard_focus": ["sales"]}
+        if response_format is not None:
+            content = json.dumps({"domain_info": domain, "charts": self.charts})
+        elif "DOMAIN of the dataset" in prompt:
+            content = json.dumps(domain)
+        else:
+            content = json.dumps({"charts": self.charts})
+
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(content)
+        latency = (RECORDED_LATENCY["base"]
+                   + RECORDED_LATENCY["prompt_token"] * prompt_tokens
+                   + RECORDED_LATENCY["completion_token"] * completion_tokens)
+        time.sleep(latency * self.time_scale)
+        self.calls.append((prompt_tokens, completion_tokens, latency))
+
+        usage = types.SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+
+def run(df: pd.DataFrame, fused: bool, time_scale: float) -> dict:
+    agent = AnalyticsAgent(fused_llm_call=fused)
+    agent.plan_cache = None
+    agent.llm_client = StubLLMClient(canned_plan(df), time_scale)
+
+    start = time.perf_counter()
+    state = agent.analyze_data(AnalyticsState(cleaned_data=df.copy()))
+    wall = time.perf_counter() - start
+    if state.status != "completed":
+        raise RuntimeError(state.error)
+
+    calls = agent.llm_client.calls
+    return {
+        "calls": len(calls),
+        "prompt_tokens": sum(c[0] for c in calls),
+        "completion_tokens": sum(c[1] for c in calls),
+        "llm_latency": sum(c[2] for c in calls),
+        "wall": wall,
+        "charts": len(state.visualization_plan.get("charts", [])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", nargs="?", default=DEFAULT_FILE)
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="multiply the modeled latency before sleeping, e.g. 0.1 for a quick run")
+    args = parser.parse_args()
+
+    cleaned = CleaningAgent().clean_data(CleaningState(raw_data=pd.read_csv(args.file))).cleaned_data
+    print(f"{os.path.basename(args.file)}: {cleaned.shape[0]} rows x {cleaned.shape[1]} columns\n")
+
+    print(f"{'mode':<10}{'calls':>6}{'prompt tok':>12}{'compl tok':>11}{'LLM s':>8}{'wall s':>9}{'charts':>8}")
+    for name, fused in (("two-call", False), ("fused", True)):
+        r = run(cleaned, fused, args.time_scale)
+        print(f"{name:<10}{r['calls']:>6}{r['prompt_tokens']:>12}{r['completion_tokens']:>11}"
+              f"{r['llm_latency']:>8.2f}{r['wall']:>9.2f}{r['charts']:>8}")
+    print(f"\nwall time includes sleeping the modeled latency x {args.time_scale}")
+
+
+if __name__ == "__main__":
+    main()
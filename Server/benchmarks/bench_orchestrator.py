@@ -0,0 +1,106 @@
+"""
+Startup time and per-request overhead of the dashboard pipeline.
+
+    python benchmarks/bench_orchestrator.py [requests]
+
+startup:   importing pipeline and building the first orchestrator (agents + compiled graph),
+           each in a fresh interpreter
+overhead:  create_dashboard on a 20-row CSV with the fake LLM backend and caching off,
+           with a new DashboardOrchestrator per request (the old main.py) against the
+           shared get_orchestrator(); the difference is what every upload paid for construction
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REPEATS = 5
+sys.path.insert(0, SERVER_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+STARTUP_SCRIPT = """
+import time, json
+start = time.perf_counter()
+import pipeline
+imported = time.perf_counter()
+pipeline.get_orchestrator()
+built = time.perf_counter()
+print(json.dumps({"import": imported - start, "build": built - imported}))
+"""
+
+
+def measure_startup() -> dict:
+    runs = []
+    for _ in range(REPEATS):
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONPATH": SERVER_DIR},
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def fake_llm():
+    from agents.llm import LLMClient, FakeBackend, set_llm_client
+
+    plan = {"charts": [
+        {"id": "1", "type": "single_value", "x": None, "y": "sales", "aggregation": "sum",
+         "title": "Total sales", "reason": "r", "priority": 1.0},
+        {"id": "2", "type": "bar", "x": "region", "y": "sales", "aggregation": "mean",
+         "title": "Sales by region", "reason": "r", "priority": 1.0},
+    ]}
+    domain = {"domain": "retail", "confidence": 0.9, "dashboard_focus": ["sales"]}
+
+    def responder(messages, response_format=None, **kwargs):
+        if response_format is not None:
+            return json.dumps({"domain_info": domain, **plan})
+        return json.dumps(domain if "DOMAIN of the dataset" in messages[-1]["content"] else plan)
+
+    set_llm_client(LLMClient(FakeBackend(responder)))
+
+
+def tiny_csv() -> bytes:
+    rows = ["region,sales"] + [f"{'nsew'[i % 4]},{100 + i}" for i in range(20)]
+    return "\n".join(rows).encode()
+
+
+def measure_requests(n: int) -> dict:
+    import contextlib
+    import io
+    import pipeline
+
+    data = tiny_csv()
+
+    def request(orchestrator_factory):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            orchestrator_factory().create_dashboard(file_obj=data, file_format=".csv", use_cache=False)
+        return time.perf_counter() - start
+
+    pipeline.get_orchestrator()  # warm up imports and the shared instance
+    per_request = [request(pipeline.DashboardOrchestrator) for _ in range(n)]
+    shared = [request(pipeline.get_orchestrator) for _ in range(n)]
+    return {"new per request": statistics.median(per_request), "shared": statistics.median(shared)}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    startup = measure_startup()
+    print(f"startup (median of {REPEATS} fresh interpreters)")
+    print(f"  import pipeline:     {startup['import'] * 1000:8.1f} ms")
+    print(f"  build orchestrator:  {startup['build'] * 1000:8.1f} ms")
+
+    fake_llm()
+    requests = measure_requests(n)
+    print(f"\nper request (median of {n}, 20-row CSV, fake LLM)")
+    for name, seconds in requests.items():
+        print(f"  {name:<18} {seconds * 1000:8.1f} ms")
+    print(f"  saved per request: {(requests['new per request'] - requests['shared']) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
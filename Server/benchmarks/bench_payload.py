@@ -0,0 +1,96 @@
+"""
+Size and serialization time of the dashboard payload: the default "json" chart values
+(x / y lists) against the "compact" typed columns (payload.py).
+
+    python benchmarks/bench_payload.py [rows] [--max-density 200]
+
+Charts are built by VisualizationAgent from a synthetic frame (daily dates, a categorical,
+two floats) with --max-density as the thinning limit; raise it to see dense charts.
+Serialization is timed with json.dumps (what jsonify does) and orjson when installed,
+sizes are reported raw and gzipped as a proxy for what goes over the wire.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import statistics
+
+import numpy as np
+import pandas as pd
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REPEATS = 5
+sys.path.insert(0, SERVER_DIR)
+
+import agents.visualization_agent.__main__ as visualization
+from agents.visualization_agent import VisualizationAgent, VisualizationState
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PLAN = {"charts": [
+    {"id": "1", "type": "single_value", "x": None, "y": "sales", "aggregation": "sum"},
+    {"id": "2", "type": "line", "x": "date", "y": "sales", "aggregation": "sum"},
+    {"id": "3", "type": "bar", "x": "store", "y": "sales", "aggregation": "mean"},
+    {"id": "4", "type": "scatter", "x": "temperature", "y": "sales", "aggregation": None},
+    {"id": "5", "type": "pie", "x": "region", "y": "sales", "aggregation": "sum"},
+]}
+
+
+def synthetic_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, 9000, rows), unit="D"),
+        "store": rng.integers(1, 5000, rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        "temperature": rng.normal(60, 15, rows).round(2),
+        "sales": rng.gamma(2.0, 50_000, rows).round(2),
+    })
+
+
+def timed(fn, *args) -> tuple:
+    runs = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        runs.append(time.perf_counter() - start)
+    return result, statistics.median(runs)
+
+
+def build(df: pd.DataFrame, payload_format: str) -> list:
+    state = VisualizationState(cleaned_data=df, visualization_plan=PLAN, payload_format=payload_format)
+    return VisualizationAgent()(state).visualizations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rows", nargs="?", type=int, default=500_000)
+    parser.add_argument("--max-density", type=int, default=visualization.MAX_DENSITY)
+    args = parser.parse_args()
+    visualization.MAX_DENSITY = args.max_density
+
+    df = synthetic_frame(args.rows)
+    print(f"{args.rows} rows, max density {args.max_density}, median of {REPEATS}\n")
+
+    encoders = {"json.dumps": lambda charts: json.dumps(charts).encode()}
+    if orjson is not None:
+        encoders["orjson"] = lambda charts: orjson.dumps(charts)
+
+    print(f"{'format':<9}{'encoder':<12}{'build ms':>10}{'dump ms':>10}{'bytes':>12}{'gzip bytes':>12}")
+    for payload_format in ("json", "compact"):
+        charts, build_time = timed(build, df, payload_format)
+        points = sum(len(chart["values"].get("x", "")) for chart in charts if payload_format == "json")
+        for name, encode in encoders.items():
+            body, dump_time = timed(encode, charts)
+            print(f"{payload_format:<9}{name:<12}{build_time * 1000:>10.1f}{dump_time * 1000:>10.2f}"
+                  f"{len(body):>12}{len(gzip.compress(body)):>12}")
+        if points:
+            print(f"{'':<9}({points} points per series in total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Visualization stage with one groupby per chart against the shared-groupby query plan
+(VISUALIZATION_SHARED_GROUPBY): a 9-chart plan that groups by the same keys several times.
+"raw dates" is the shared plan with RESAMPLE_FREQUENCIES off, grouping by every distinct date
+instead of resampling the date axis to at most MAX_DENSITY periods. "cube" answers the grouped
+charts from an AggregationCube (cube.py) over the plan's x columns, built once beforehand.
+
+    python benchmarks/bench_visualization.py [rows]
+
+Prints the per-chart and per-groupby timings the agent records in VisualizationState.timings.
+"""
+import os
+import sys
+import time
+import statistics
+
+import numpy as np
+import pandas as pd
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REPEATS = 5
+sys.path.insert(0, SERVER_DIR)
+
+import agents.visualization_agent.__main__ as visualization
+from agents.visualization_agent import VisualizationAgent, VisualizationState
+from cube import AggregationCube
+
+PLAN = {"charts": [
+    {"id": "1", "type": "single_value", "x": None, "y": "sales", "aggregation": "sum"},
+    {"id": "2", "type": "line", "x": "date", "y": "sales", "aggregation": "sum"},
+    {"id": "3", "type": "line", "x": "date", "y": "price", "aggregation": "mean"},
+    {"id": "4", "type": "line", "x": "date", "y": "units", "aggregation": "sum"},
+    {"id": "5", "type": "bar", "x": "store", "y": "sales", "aggregation": "sum"},
+    {"id": "6", "type": "bar", "x": "store", "y": "sales", "aggregation": "mean"},
+    {"id": "7", "type": "bar", "x": "store", "y": "units", "aggregation": "count"},
+    {"id": "8", "type": "pie", "x": "region", "y": "sales", "aggregation": "sum"},
+    {"id": "9", "type": "scatter", "x": "price", "y": "sales", "aggregation": None},
+]}
+
+
+def synthetic_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2010-01-01") + pd.to_timedelta(rng.integers(0, 3000, rows), unit="D")
+                + pd.to_timedelta(rng.integers(0, 24, rows), unit="h"),
+        "store": rng.integers(1, 50, rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        "price": rng.uniform(1, 100, rows).round(2),
+        "units": rng.integers(0, 100, rows),
+        "sales": rng.gamma(2.0, 500, rows).round(2),
+    })
+
+
+def run(df: pd.DataFrame, shared: bool, resample: bool = True, cube: AggregationCube = None) -> dict:
+    frequencies = visualization.RESAMPLE_FREQUENCIES
+    visualization.RESAMPLE_FREQUENCIES = frequencies if resample else []
+    agent = VisualizationAgent(shared_groupby=shared)
+    runs = []
+    for _ in range(REPEATS):
+        state = agent(VisualizationState(cleaned_data=df, visualization_plan=PLAN, cube=cube))
+        if state.status != "success":
+            raise RuntimeError(state.error)
+        runs.append(state.timings)
+    visualization.RESAMPLE_FREQUENCIES = frequencies
+    return {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    df = synthetic_frame(rows)
+    print(f"{rows} rows, {len(PLAN['charts'])} charts, median of {REPEATS}\n")
+
+    dimensions = list(dict.fromkeys(c["x"] for c in PLAN["charts"] if c["aggregation"] and c["x"]))
+    start = time.perf_counter()
+    cube = AggregationCube.build(df, dimensions, list(df.select_dtypes(include="number").columns))
+    print(f"cube over {', '.join(dimensions)}: built in {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{cube.nbytes / 1024:.1f} KB\n")
+
+    results = {
+        "per chart": run(df, False),
+        "shared": run(df, True),
+        "raw dates": run(df, True, resample=False),
+        "cube": run(df, True, cube=cube),
+    }
+    names = list(dict.fromkeys(name for timings in results.values() for name in timings))
+    print(f"{'timing (ms)':<18}" + "".join(f"{mode:>12}" for mode in results))
+    for name in names:
+        print(f"{name:<18}" + "".join(
+            f"{timings[name] * 1000:>12.1f}" if name in timings else f"{'-':>12}" for timings in results.values()
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Cold-start check for the Cloud Run service: time of "import main" from `python -X importtime`.
+
+    python benchmarks/check_importtime.py [budget ms]
+
+Fails (exit code 1) when the import takes longer than CFG.COLD_START_IMPORT_BUDGET_MS,
+best of REPEATS fresh interpreters, or when it loads one of HEAVY_MODULES, which must
+only be imported on first use or by the warmup thread (disabled here).
+"""
+import os
+import sys
+import subprocess
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REPEATS = 3
+sys.path.insert(0, SERVER_DIR)
+
+from CFG import COLD_START_IMPORT_BUDGET_MS
+
+HEAVY_MODULES = ["pandas", "numpy", "langgraph", "langchain_openai", "openai", "httpx", "google.cloud.storage"]
+
+SCRIPT = f"""
+import CFG
+CFG.WARMUP_ON_START = False
+import main
+import sys
+print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def import_report() -> tuple:
+    """(total microseconds of "import main", {module: cumulative us}, heavy modules loaded)"""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT], cwd=SERVER_DIR, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": SERVER_DIR},
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr[-2000:])
+
+    modules = {}
+    for line in out.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    loaded = [m for m in out.stdout.strip().split(",") if m]
+    return modules["main"], modules, loaded
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else COLD_START_IMPORT_BUDGET_MS
+
+    runs = [import_report() for _ in range(REPEATS)]
+    total, modules, loaded = min(runs, key=lambda run: run[0])
+
+    top_level = sorted(
+        ((name, us) for name, us in modules.items() if "." not in name and name != "main"),
+        key=lambda item: -item[1],
+    )
+    print(f"import main: {total / 1000:.1f} ms (best of {REPEATS}), budget {budget_ms:.0f} ms")
+    print("slowest top-level imports:")
+    for name, us in top_level[:10]:
+        print(f"  {name:<24} {us / 1000:8.1f} ms")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(loaded)}")
+        failed = True
+    if total / 1000 > budget_ms:
+        print("FAIL: cold-start import budget exceeded")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import CFG
+
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "uploads", "cache")
+PLAN_CACHE_DIR = os.path.join(os.path.dirname(__file__), "uploads", "plan_cache")
+
+# CFG settings that change the generated dashboard or the LLM prompt, part of every cache key
+# (dashboard cache and, through the schema signature, plan cache)
+_CONFIG_KEYS = [
+    "CHART_TYPES",
+    "MIN_N_CHARTS",
+    "MAX_N_CHARTS",
+    "MIN_N_TYPES",
+    "MAX_N_TYPES",
+    "MAX_DENSITY",
+    "DOWNSAMPLING",
+    "RESAMPLE_FREQUENCIES",
+    "AGGREGATION_CUBE",
+    "CUBE_MAX_CARDINALITY",
+    "CUBE_MAX_UNIQUE_RATIO",
+    "CSV_UNIT",
+    "INGESTION_MEMORY_BUDGET_MB",
+    "INGESTION_CHUNK_ROWS",
+    "INGESTION_SAMPLE_ROWS",
+    "INGESTION_SNIFF_ROWS",
+    "INGESTION_CATEGORY_RATIO",
+    "CLEANING_MISSING_STRATEGY",
+    "CLEANING_COLUMN_STRATEGIES",
+    "NUMERIC_THRESHOLD",
+    "NUMERIC_SAMPLE_SIZE",
+    "CORRELATION_METHOD",
+    "CORRELATION_THRESHOLD",
+    "CORRELATION_TOP_K",
+    "CORRELATION_SAMPLE_ROWS",
+    "SKETCH_MIN_ROWS",
+    "SKETCH_SAMPLE_ROWS",
+    "SKETCH_CARDINALITY_RATIO",
+    "SKETCH_PRECISION",
+    "SKETCH_CAPACITY",
+    "ANALYTICS_FUSED_LLM_CALL",
+    "PROMPT_TOKEN_BUDGET",
+    "PROMPT_MAX_COLUMNS",
+    "PROMPT_SAMPLE_ROWS",
+]
+
+
+def config_fingerprint() -> str:
+    """Hash of the CFG settings that influence the dashboard"""
+    settings = {key: getattr(CFG, key, None) for key in _CONFIG_KEYS}
+    payload = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash of the file content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dashboard_cache_key(file_digest: str, file_format: str, options: dict = None) -> str:
+    """Cache key for a dashboard: hash of the file bytes + file format + request options + CFG settings"""
+    parts = [file_digest, file_format.lower(), json.dumps(options or {}, sort_keys=True), config_fingerprint()]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class CacheBackend:
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with an entry limit and a TTL (seconds, None = no expiry)"""
+
+    def __init__(self, max_entries: int = 64, ttl: float = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if self.ttl is not None and time.time() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            # evict least recently used entries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache(CacheBackend):
+    """JSON file per entry; LRU order follows file mtime, which is refreshed on every hit"""
+
+    def __init__(self, directory: str = CACHE_DIR, max_entries: int = 64, ttl: float = None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if self.ttl is not None and time.time() - entry.get("created", 0) > self.ttl:
+                self._remove(path)
+                return None
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return entry.get("value")
+
+    def set(self, key: str, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "value": value}, f)
+            # atomic replace so readers never see a partial file
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(self._path(key))
+
+    def clear(self):
+        with self._lock:
+            for path in self._entry_paths():
+                self._remove(path)
+
+    def _entry_paths(self):
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+
+    def _evict(self):
+        paths = self._entry_paths()
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=lambda p: os.path.getmtime(p))
+        for path in paths[:len(paths) - self.max_entries]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def make_cache(backend: str, max_entries: int, ttl: float = None, directory: str = CACHE_DIR):
+    """Build a cache backend by name"""
+    if backend == "memory":
+        return MemoryCache(max_entries=max_entries, ttl=ttl)
+    if backend == "disk":
+        return DiskCache(directory=directory, max_entries=max_entries, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+_dashboard_cache = None
+_dashboard_cache_lock = threading.Lock()
+def get_dashboard_cache():
+    """Process-wide dashboard cache configured by CFG, None when caching is disabled"""
+
+    global _dashboard_cache
+    backend = getattr(CFG, "DASHBOARD_CACHE_BACKEND", None)
+    if not backend:
+        return None
+    with _dashboard_cache_lock:
+        if _dashboard_cache is None:
+            _dashboard_cache = make_cache(
+                backend,
+                max_entries=CFG.DASHBOARD_CACHE_MAX_ENTRIES,
+                ttl=CFG.DASHBOARD_CACHE_TTL,
+            )
+    return _dashboard_cache
+
+
+_plan_cache = None
+_plan_cache_lock = threading.Lock()
+def get_plan_cache():
+    """Process-wide LLM plan cache configured by CFG, None when caching is disabled"""
+
+    global _plan_cache
+    backend = getattr(CFG, "PLAN_CACHE_BACKEND", None)
+    if not backend:
+        return None
+    with _plan_cache_lock:
+        if _plan_cache is None:
+            _plan_cache = make_cache(
+                backend,
+                max_entries=CFG.PLAN_CACHE_MAX_ENTRIES,
+                ttl=CFG.PLAN_CACHE_TTL,
+                directory=PLAN_CACHE_DIR,
+            )
+    return _plan_cache
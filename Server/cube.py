@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+# what the cube keeps per (dimension value, measure); every supported aggregation derives from them
+STATS = ("sum", "count", "sumsq")
+CUBE_AGGREGATIONS = ("sum", "count", "mean", "var", "std")
+
+
+def cube_dimensions(df: pd.DataFrame, categorical_insights: dict, max_cardinality: int,
+                    max_unique_ratio: float) -> list:
+    """
+    Columns worth pre-aggregating by: the categoricals of the analytics insights first, then
+    integer / boolean columns and dates (by day). A column qualifies with at most max_cardinality
+    values and at most max_unique_ratio values per row, which keeps ids and continuous integer
+    measures out, so the cube stays small next to the data it summarizes.
+    """
+    limit = min(max_cardinality, max_unique_ratio * len(df))
+    categorical = [
+        col for col in df.columns
+        if col in categorical_insights and categorical_insights[col]["unique_count"] <= limit
+    ]
+    others = []
+    for col in df.columns:
+        values = df[col]
+        if col in categorical_insights:
+            continue
+        if pd.api.types.is_datetime64_any_dtype(values):
+            cardinality = values.dt.normalize().nunique()
+        elif pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+            cardinality = values.nunique()
+        else:
+            continue
+        if cardinality <= limit:
+            others.append(col)
+    return categorical + others
+
+
+def _finalize(table: pd.DataFrame, aggregations: dict, dtypes: dict) -> pd.DataFrame:
+    """
+    {measure: [aggregations]} from a (measure, stat) table, as (measure, aggregation) columns.
+    Sums of integer measures (dtypes: measure -> dtype name) are integers, like on the rows
+    """
+    columns = {}
+    for measure, aggs in aggregations.items():
+        total, count, sumsq = (table[(measure, stat)] for stat in STATS)
+        for agg in aggs:
+            if agg == "sum":
+                integer = pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(dtypes.get(measure, "float64")))
+                columns[(measure, agg)] = total.round().astype(np.int64) if integer else total
+            elif agg == "count":
+                columns[(measure, agg)] = count.astype(np.int64)
+            elif agg == "mean":
+                columns[(measure, agg)] = total / count.where(count > 0)
+            elif agg in ("var", "std"):
+                # sample variance, clipped at 0 against rounding
+                var = ((sumsq - total * total / count.where(count > 0)) / (count - 1).where(count > 1)).clip(lower=0)
+                columns[(measure, agg)] = var if agg == "var" else np.sqrt(var)
+            else:
+                raise ValueError(f"Unsupported cube aggregation: {agg}")
+    return pd.DataFrame(columns, index=table.index)
+
+
+class AggregationCube:
+    """
+    Sum, count and sum of squares of every numeric measure per value of each dimension, built
+    in one groupby pass per dimension. Charts grouped by a dimension are answered in O(values)
+    instead of O(rows), and the stats merge, so dates kept by day can be regrouped by week or month.
+    """
+
+    def __init__(self, tables: dict = None, totals: pd.Series = None, n_rows: int = 0, dtypes: dict = None):
+        # dimension -> frame indexed by the dimension values, (measure, stat) columns
+        self.tables = tables if tables is not None else {}
+        # (measure, stat) over all rows, for single values
+        self.totals = totals if totals is not None else pd.Series(dtype=np.float64)
+        self.n_rows = n_rows
+        # measure -> dtype name of the column, the stats themselves are float64
+        self.dtypes = dtypes if dtypes is not None else {}
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, dimensions: list, measures: list) -> "AggregationCube":
+        values = df[measures].astype(np.float64)
+        frame = pd.concat({
+            "sum": values,
+            "count": values.notna().astype(np.float64),
+            "sumsq": values * values,
+        }, axis=1).swaplevel(axis=1)
+
+        tables = {}
+        for dimension in dimensions:
+            key = df[dimension]
+            if pd.api.types.is_datetime64_any_dtype(key):
+                key = key.dt.normalize()
+            tables[dimension] = frame.groupby(key, observed=True).sum()
+        return cls(tables, frame.sum(), len(df), {measure: str(df[measure].dtype) for measure in measures})
+
+    @property
+    def columns(self) -> set:
+        """Dimensions and measures the cube can answer for"""
+        columns = set(self.tables)
+        for table in self.tables.values():
+            columns.update(table.columns.get_level_values(0))
+        return columns
+
+    def covers(self, dimension: str, measures) -> bool:
+        table = self.tables.get(dimension)
+        return table is not None and all((measure, "sum") in table.columns for measure in measures)
+
+    def total(self, measure: str, agg: str) -> float:
+        """Aggregation of a measure over all rows, like df[measure].agg(agg)"""
+        if (measure, "sum") not in self.totals.index:
+            raise KeyError(f"Measure not in the cube: {measure}")
+        return _finalize(self.totals.to_frame().T, {measure: [agg]}, self.dtypes).iloc[0, 0]
+
+    def aggregate(self, dimension: str, aggregations: dict, keys=None) -> pd.DataFrame:
+        """
+        Like df.groupby(dimension).agg(aggregations). keys (one per dimension value, e.g. the
+        week of each day) regroups the dimension values first.
+        """
+        table = self.tables[dimension]
+        if keys is not None:
+            table = table.groupby(np.asarray(keys)).sum().rename_axis(dimension)
+        return _finalize(table, aggregations, self.dtypes)
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(table.memory_usage(index=True).sum() for table in self.tables.values()))
+
+    def to_dict(self) -> dict:
+        """JSON-friendly form, e.g. to store next to the dashboard in the cache"""
+        dimensions = {}
+        for dimension, table in self.tables.items():
+            index = table.index
+            dimensions[dimension] = {
+                "dtype": str(index.dtype),
+                "index": index.astype(str).tolist() if isinstance(index, pd.DatetimeIndex) else index.tolist(),
+                "measures": {
+                    measure: {stat: table[(measure, stat)].tolist() for stat in STATS}
+                    for measure in table.columns.get_level_values(0).unique()
+                },
+            }
+        totals = {
+            measure: {stat: float(self.totals[(measure, stat)]) for stat in STATS}
+            for measure in self.totals.index.get_level_values(0).unique()
+        }
+        return {"n_rows": self.n_rows, "dtypes": self.dtypes, "totals": totals, "dimensions": dimensions}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AggregationCube":
+        tables = {}
+        for dimension, entry in data["dimensions"].items():
+            if entry["dtype"].startswith("datetime64"):
+                index = pd.DatetimeIndex(pd.to_datetime(entry["index"]), name=dimension)
+            elif entry["dtype"] in ("object", "category", "string"):
+                index = pd.Index(entry["index"], dtype=object, name=dimension)
+            else:
+                index = pd.Index(entry["index"], dtype=entry["dtype"], name=dimension)
+            tables[dimension] = pd.DataFrame({
+                (measure, stat): stats[stat] for measure, stats in entry["measures"].items() for stat in STATS
+            }, index=index, dtype=np.float64)
+        totals = pd.Series({
+            (measure, stat): stats[stat] for measure, stats in data.get("totals", {}).items() for stat in STATS
+        }, dtype=np.float64)
+        return cls(tables, totals, data.get("n_rows", 0), data.get("dtypes", {}))
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+
+def _positions(values: pd.Series) -> np.ndarray:
+    """Values as float64 coordinates: numbers as is, dates as nanoseconds, anything else by position"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    if pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.arange(len(values), dtype=np.float64)
+
+
+def stride_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Every step-th point"""
+    step = -(-len(y) // n_out)
+    return np.arange(0, len(y), step)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point and, from each of n_out - 2
+    buckets, the point forming the largest triangle with the previous pick and the next bucket's mean.
+    Bucket means are computed for all buckets at once; the loop only runs once per output point.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n) if n_out >= n else np.array([0, n - 1])
+
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(bounds)
+    mean_x = np.add.reduceat(x[:n - 1], bounds[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], bounds[:-1]) / counts
+    # the point each bucket is compared against: the next bucket's mean, the last point for the last bucket
+    next_x = np.append(mean_x[1:], x[n - 1])
+    next_y = np.append(mean_y[1:], y[n - 1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """The minimum and maximum of each of (n_out - 2) / 2 buckets, plus the first and last point"""
+    n = len(y)
+    n_buckets = max(1, (n_out - 2) // 2)
+    bounds = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(bounds))
+
+    picks = [np.array([0, n - 1])]
+    for reduce in (np.fmin, np.fmax):
+        extreme = reduce.reduceat(y, bounds[:-1])
+        # first point of each bucket equal to its extreme, all-NaN buckets have none
+        hits = np.flatnonzero(y == extreme[bucket])
+        _, first = np.unique(bucket[hits], return_index=True)
+        picks.append(hits[first])
+    return np.unique(np.concatenate(picks))
+
+
+def grid_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Scatter thinning on a sqrt(n_out) x sqrt(n_out) grid: every occupied cell keeps at least one
+    point, so outliers survive, and the rest of the budget is shared by the cells in proportion
+    to how many points they hold, so dense regions stay dense.
+    """
+    n = len(y)
+    size = max(1, int(np.sqrt(n_out)))
+
+    def cells(values):
+        values = np.nan_to_num(values, nan=np.nanmin(values) if not np.isnan(values).all() else 0.0)
+        lo, hi = values.min(), values.max()
+        if hi <= lo:
+            return np.zeros(n, dtype=np.int64)
+        return np.minimum(((values - lo) / (hi - lo) * size).astype(np.int64), size - 1)
+
+    cell = cells(x) * size + cells(y)
+    counts = np.bincount(cell, minlength=size * size)
+    quota = 1 + counts * max(0, n_out - np.count_nonzero(counts)) // n
+
+    # rank of every point within its cell, in the original order; a stable sort of small
+    # integers is a radix sort in numpy
+    order = np.argsort(cell.astype(np.uint16) if size * size <= 1 << 16 else cell, kind="stable")
+    starts = np.cumsum(counts) - counts
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - starts[cell[order]]
+    return np.flatnonzero(rank < quota[cell])
+
+
+DOWNSAMPLERS = {
+    "stride": stride_indices,
+    "lttb": lttb_indices,
+    "minmax": minmax_indices,
+    "grid": grid_indices,
+}
+
+
+def downsample(xs: pd.Series, ys: pd.Series, max_points: int, method: str) -> tuple:
+    """(xs, ys) reduced to at most max_points with one of DOWNSAMPLERS"""
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown downsampling method: {method}. Allowed: {', '.join(DOWNSAMPLERS)}")
+    if len(ys) <= max_points:
+        return xs, ys
+    index = DOWNSAMPLERS[method](_positions(xs), _positions(ys), max_points)
+    return xs.iloc[index], ys.iloc[index]
@@ -0,0 +1,126 @@
+
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from CFG import JOB_MAX_WORKERS, JOB_MAX_QUEUE, JOB_RESULT_TTL
+
+
+# pipeline stages in execution order, used to report progress
+STAGES = ["init", "ingestion", "cleaning", "analytics", "cube", "visualization", "finalize"]
+
+
+class QueueFullError(Exception):
+    """Raised when all workers are busy and the waiting queue is full"""
+
+
+class Job:
+
+    def __init__(self, job_id: str):
+        self.id: str = job_id
+        self.status: str = "queued"  # queued | running | completed | failed
+        self.stage: str = "init"
+        self.messages: list = []
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at: float = time.time()
+        self.updated_at: float = self.created_at
+        self.version: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        # a failed job keeps the progress of the stage it failed in
+        stage_idx = STAGES.index(self.stage) if self.stage in STAGES else 0
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": 1.0 if self.status == "completed" else round(stage_idx / (len(STAGES) - 1), 2),
+            "messages": list(self.messages),
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+        if include_result and self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool; at most max_workers running and max_queue waiting"""
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, max_queue: int = JOB_MAX_QUEUE, result_ttl: float = JOB_RESULT_TTL):
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def submit(self, fn, *args, **kwargs) -> Job:
+        """
+        Schedule fn(job, *args, **kwargs); its return value becomes the job result.
+        Raises QueueFullError instead of blocking when the pool is saturated.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Too many dashboards in progress, try again later")
+
+        job = Job(uuid.uuid4().hex)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        try:
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def update(self, job: Job, **fields):
+        """Set job fields and wake up anyone waiting for changes"""
+        with self._changed:
+            for key, value in fields.items():
+                setattr(job, key, value)
+            job.updated_at = time.time()
+            job.version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, job: Job, version: int, timeout: float = 15.0) -> int:
+        """Block until job.version differs from version (or timeout), return the current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: job.version != version, timeout=timeout)
+            return job.version
+
+    def queue_depth(self) -> int:
+        """Jobs running or waiting for a worker, reported by /healthz and with 429s"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _run(self, job: Job, fn, args, kwargs):
+        try:
+            self.update(job, status="running")
+            result = fn(job, *args, **kwargs)
+            self.update(job, status="completed", stage="finalize", result=result)
+        except Exception as e:
+            self.update(job, status="failed", error=str(e))
+        finally:
+            self._slots.release()
+
+    def _prune(self):
+        # drop finished jobs whose result is older than the TTL, caller holds the lock
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.updated_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -1,17 +1,37 @@
 import os
+import json
 import uuid
-from flask import Flask, request, jsonify
+import threading
+from flask import Flask, Request, Response, request, jsonify
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
-from pipeline import DashboardOrchestrator
-from google.cloud import storage
+from jobs import JobManager, QueueFullError
+from archive import get_archiver
+from streams import HashingBuffer, HashingFile, buffer_fingerprint
+from concurrent.futures import wait
+from CFG import ARCHIVE_BACKEND, ARCHIVE_WAIT, GCS_BUCKET_NAME, WARMUP_ON_START
+from CFG import UPLOAD_MEMORY_LIMIT_MB, UPLOAD_MAX_SIZE_MB
+
+try:
+    import orjson
+except ImportError:  # optional, job results are encoded with the json module instead
+    orjson = None
+
+# pandas, numpy, langgraph, openai and google-cloud-storage are imported on first use
+# (or by the warmup thread), so the server starts listening and answers /healthz quickly
 
 
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_SIZE_MB * 1024 * 1024
 CORS(app)
 
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# large uploads, written here while the request is parsed and removed once processed
+UPLOAD_TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+
+job_manager = JobManager()
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'json', 'parquet'}
@@ -25,27 +45,150 @@ def home():
     return "IntelliDash REST API is running."
 
 
-# Cloud Run: use /tmp for temporary files
-TMP_DIR = "/tmp"
+_warm = threading.Event()
+def get_orchestrator():
+    """Import the pipeline and build the shared orchestrator on first use"""
+    from pipeline import get_orchestrator as _get_orchestrator
+    orchestrator = _get_orchestrator()
+    _warm.set()
+    return orchestrator
+
+
+def _warmup():
+    try:
+        get_orchestrator()
+        print("Warmup done: pipeline loaded")
+    except Exception as e:
+        print(f"Warmup failed, loading on the first upload instead: {e}")
 
-# Make sure to create this bucket in GCP console
-GCS_BUCKET_NAME = 'intellidash'
 
-def upload_to_gcs(local_path, destination_blob_name, content_type):
+@app.route("/healthz", methods=["GET"])
+def healthz():
     """
-    Uploads a local file to GCS and returns the gs:// URI.
+    Liveness check that never imports the pipeline; warm tells whether it is loaded,
+    queue_depth how many dashboard jobs are running or waiting
     """
-    if not GCS_BUCKET_NAME:
-        raise RuntimeError("Missing env var GCS_BUCKET_NAME")
+    return jsonify({"status": "ok", "warm": _warm.is_set(), "queue_depth": job_manager.queue_depth()}), 200
 
-    client = storage.Client()
-    bucket = client.bucket(GCS_BUCKET_NAME)
-    blob = bucket.blob(destination_blob_name)
 
-    blob.upload_from_filename(local_path, content_type=content_type)
+if WARMUP_ON_START:
+    # load the pipeline in the background while the server already accepts requests
+    threading.Thread(target=_warmup, name="warmup", daemon=True).start()
+
+
+class UploadRequest(Request):
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # hash uploads while the request body is parsed; small ones stay in memory, larger ones
+        # (or of unknown length) go to a file that the pipeline and the archiver read by path
+        if total_content_length is not None and total_content_length <= UPLOAD_MEMORY_LIMIT_MB * 1024 * 1024:
+            return HashingBuffer()
+        return HashingFile(UPLOAD_TMP_DIR, suffix=os.path.splitext(filename or "")[1].lower())
+
+
+app.request_class = UploadRequest
+
+
+def _archive_status(future):
+    """Archive report for a finished upload future"""
+    try:
+        return {"status": "completed", "uri": future.result(), "error": None}
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+
+def _discard_upload(data):
+    """Release an upload handed over by keep(): the view of an in-memory one, the file of a large one"""
+    if isinstance(data, memoryview):
+        data.release()
+    elif isinstance(data, str):
+        try:
+            os.remove(data)
+        except FileNotFoundError:
+            pass
+
+
+def _dumps(payload) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(payload)
+
+
+def _json_response(payload, status: int = 200) -> Response:
+    """Like jsonify, with orjson when it is installed: job results carry every chart's values"""
+    return Response(_dumps(payload), status=status, mimetype="application/json")
+
+
+def _run_dashboard_job(job, data, file_digest, unique_name, content_type, missing_strategy=None,
+                       payload_format=None):
+    """
+    Worker side of /upload: archive the raw bytes while the pipeline parses the same buffer.
+    data is the in-memory upload, or the path of a large one, removed once both are done with it
+    """
+    archiver = get_archiver()
+    object_name = f"uploads/{unique_name}"
+    archive = {
+        "backend": ARCHIVE_BACKEND,
+        "object": object_name,
+        "uri": archiver.backend.uri_for(object_name),
+        "status": "pending",
+        "error": None,
+    }
+
+    # 1) Store the raw upload durably, in the background
+    try:
+        archive_future = archiver.submit(data, object_name, content_type)
+    except Exception:
+        _discard_upload(data)
+        raise
+
+    def on_archived(future):
+        # the result dict references archive, so the job reports the final status
+        archive.update(_archive_status(future))
+        job_manager.update(job)
+
+    # 2) Run the orchestrator on the upload, reporting each stage
+    final_state = {}
+    def on_update(state):
+        # after an error the remaining nodes only pass the state on, the job stays at the failed stage
+        failed = final_state.get("error")
+        final_state.update(state)
+        fields = {"messages": list(state["messages"])}
+        if not failed:
+            fields["stage"] = state["current_stage"]
+        job_manager.update(job, **fields)
+
+    source = {"file_path": data} if isinstance(data, str) else {"file_obj": data}
+    try:
+        result = get_orchestrator().create_dashboard(
+            **source,
+            file_format=os.path.splitext(unique_name)[1],
+            file_digest=file_digest,
+            missing_strategy=missing_strategy,
+            payload_format=payload_format,
+            on_update=on_update,
+        )
+    finally:
+        # the pipeline is done with the file, the archive removes it when it is done too
+        archive_future.add_done_callback(lambda future: _discard_upload(data))
+    if final_state.get("error"):
+        raise RuntimeError(final_state["error"])
+
+    if ARCHIVE_WAIT:
+        wait([archive_future])
+        archive.update(_archive_status(archive_future))
+    else:
+        archive_future.add_done_callback(on_archived)
+
+    return {
+        "success": True,
+        "message": "File uploaded and dashboard created successfully",
+        "filename": unique_name,
+        "file_digest": file_digest,
+        "archive": archive,
+        "dashboard": result,
+    }
 
-    return f"gs://{GCS_BUCKET_NAME}/{destination_blob_name}"
-    
 
 @app.route("/upload", methods=["POST"])
 def upload_and_create_dashboard():
@@ -61,51 +204,120 @@ def upload_and_create_dashboard():
     if not allowed_file(file.filename):
         return jsonify({"error": f"File type not supported. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
 
-    if not GCS_BUCKET_NAME:
+    if ARCHIVE_BACKEND == "gcs" and not GCS_BUCKET_NAME:
         return jsonify({"error": "Server misconfigured: GCS_BUCKET_NAME not set"}), 500
-    
-    local_path = None
+
+    # optional: how the cleaning agent handles missing values for this upload
+    missing_strategy = request.form.get("missing_strategy") or None
+    from agents.cleaning_agent import MISSING_STRATEGIES
+    if missing_strategy is not None and missing_strategy not in MISSING_STRATEGIES:
+        return jsonify({"error": f"Unknown missing_strategy. Allowed: {', '.join(MISSING_STRATEGIES)}"}), 400
+
+    # optional: "json" (default) or "compact" typed columns for the chart values
+    payload_format = request.form.get("payload_format") or None
+    from payload import PAYLOAD_FORMATS
+    if payload_format is not None and payload_format not in PAYLOAD_FORMATS:
+        return jsonify({"error": f"Unknown payload_format. Allowed: {', '.join(PAYLOAD_FORMATS)}"}), 400
 
     try:
         safe_name = secure_filename(file.filename)
         unique_name = f"{uuid.uuid4().hex}_{safe_name}"
 
-        # 1) Save to /tmp (ephemeral but fine for request-time processing)
-        local_path = os.path.join(TMP_DIR, unique_name)
-        file.save(local_path)
-
-        # 2) Upload to GCS (store the raw upload durably)
-        gcs_object_name = f"uploads/{unique_name}"
-        gcs_uri = upload_to_gcs(
-            local_path=local_path,
-            destination_blob_name=gcs_object_name,
-            content_type=file.mimetype,
-        )
-
-        # 3) Run your existing orchestrator against the local temp file
-        orchestrator = DashboardOrchestrator()
-        result = orchestrator.create_dashboard(local_path)
+        # The upload was buffered and hashed while the form was parsed, share it without copying.
+        # keep() hands it over to the job, so closing the request leaves it alone; a large upload
+        # on disk is passed on by path and removed by the job
+        if isinstance(file.stream, (HashingBuffer, HashingFile)):
+            file_digest = file.stream.hexdigest()
+            data = file.stream.keep()
+        else:
+            data = file.read()
+            file_digest = buffer_fingerprint(data)
+
+        # The rest runs on the worker pool, the client polls /jobs/<id>
+        try:
+            job = job_manager.submit(_run_dashboard_job, data, file_digest, unique_name, file.mimetype,
+                                     missing_strategy, payload_format)
+        except Exception:
+            _discard_upload(data)
+            raise
 
         return jsonify({
             "success": True,
-            "message": "File uploaded and dashboard created successfully",
+            "message": "File uploaded, dashboard creation started",
             "filename": unique_name,
-            "gcs_bucket": GCS_BUCKET_NAME,
-            "gcs_object": gcs_object_name,
-            "gcs_uri": gcs_uri,
-            "dashboard": result,
-        }), 200
+            "file_digest": file_digest,
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}",
+        }), 202
+
+    except QueueFullError as e:
+        return jsonify({"error": str(e), "queue_depth": job_manager.queue_depth()}), 429, {"Retry-After": "10"}
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        # 4) Cleanup local temp file (best practice on Cloud Run)
-        if local_path and os.path.exists(local_path):
-            try:
-                os.remove(local_path)
-            except Exception:
-                pass
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return _json_response(job.to_dict(), 200)
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def stream_job(job_id):
+    """Server-sent events: one event per job update, the last one carries the result"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+
+    def events():
+        version = -1
+        while True:
+            current = job_manager.wait_for_change(job, version)
+            if current == version:
+                # keep-alive comment so proxies do not close the idle stream
+                yield ": ping\n\n"
+                continue
+            version = current
+            yield f"data: {_dumps(job.to_dict(include_result=job.finished))}\n\n"
+            if job.finished:
+                break
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.route("/render", methods=["POST"])
+def render_dashboard():
+    """
+    Re-render a changed chart plan from the aggregation cube cached by an earlier /upload of the
+    same file (AGGREGATION_CUBE), without rerunning the pipeline. JSON body: file_digest and
+    file_format of the upload, charts, optional missing_strategy (as uploaded) and payload_format
+    """
+    body = request.get_json(silent=True) or {}
+    file_digest = body.get("file_digest")
+    file_format = body.get("file_format") or ""
+    charts = body.get("charts")
+    if not file_digest or not file_format or not isinstance(charts, list):
+        return jsonify({"error": "Please include 'file_digest', 'file_format' and a 'charts' list"}), 400
+    if not file_format.startswith("."):
+        file_format = f".{file_format}"
+
+    payload_format = body.get("payload_format") or None
+    from payload import PAYLOAD_FORMATS
+    if payload_format is not None and payload_format not in PAYLOAD_FORMATS:
+        return jsonify({"error": f"Unknown payload_format. Allowed: {', '.join(PAYLOAD_FORMATS)}"}), 400
+
+    try:
+        result = get_orchestrator().render_from_cube(file_digest, file_format, charts,
+                                                     missing_strategy=body.get("missing_strategy") or None,
+                                                     payload_format=payload_format)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if result is None:
+        return jsonify({"error": "No aggregation cube cached for this file, upload it again"}), 404
+    return _json_response({"success": True, "dashboard": result}, 200)
 
 
 @app.route("/upload_legacy", methods=["POST"])
@@ -128,16 +340,15 @@ def upload_and_create_dashboard_legacy():
         save_path = os.path.abspath(os.path.join(UPLOAD_DIR, unique_name))
         file.save(save_path)
 
-        orchestrator = DashboardOrchestrator()
-        result = orchestrator.create_dashboard(save_path)
+        result = get_orchestrator().create_dashboard(save_path)
 
-        return jsonify({
+        return _json_response({
             "success": True,
             "message": "File uploaded and dashboard created successfully",
             # "file_path": save_path,
             "filename": unique_name,
             "dashboard": result,
-        }), 200
+        }, 200)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,107 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+# "json": plain lists per chart (default), "compact": typed columns, see encode_column
+PAYLOAD_FORMATS = ("json", "compact")
+
+
+def _b64(array: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+def _code_type(n_values: int) -> str:
+    # signed so that -1 can mark a missing value
+    if n_values < 2 ** 7:
+        return "<i1"
+    if n_values < 2 ** 15:
+        return "<i2"
+    return "<i4"
+
+
+def _at_midnight(series: pd.Series) -> bool:
+    values = series.dropna()
+    return bool((values == values.dt.normalize()).all())
+
+
+def date_strings(series: pd.Series) -> pd.Series:
+    """ISO strings of a datetime series: "%Y-%m-%d", with the time of day when any value has one"""
+    return series.dt.strftime("%Y-%m-%d" if _at_midnight(series) else "%Y-%m-%dT%H:%M:%S")
+
+
+def _dict_column(series: pd.Series) -> dict:
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    code_type = _code_type(len(uniques))
+    return {
+        "type": "dict",
+        "values": [value.item() if hasattr(value, "item") else value for value in uniques],
+        "code_type": code_type[1:],
+        "codes": _b64(codes.astype(code_type)),
+    }
+
+
+def encode_column(series: pd.Series) -> dict:
+    """
+    One chart column as a typed array, base64 of the little-endian bytes:
+        i32   {"data"}                              integers (and integer-valued floats) without missing values
+        f32   {"data"}                              floats that float32 holds exactly, NaN for missing values
+        f64   {"data"}                              other floats (large or with more digits), NaN for missing values
+        bool  {"data"}                              one byte per value
+        date  {"start", "deltas"}                   days since 1970-01-01, deltas from the previous date
+        datetime {"start", "deltas"}                seconds since 1970-01-01, for values with a time of day
+        dict  {"values", "code_type", "codes"}      categories and strings, code -1 is missing
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        kind, unit = ("date", "D") if _at_midnight(series) else ("datetime", "s")
+        values = series.to_numpy(dtype="datetime64[ns]").astype(f"datetime64[{unit}]")
+        if not np.isnat(values).any() and len(values):
+            values = values.astype(np.int64)
+            deltas = np.diff(values, prepend=values[0])
+            if np.abs(deltas).max() < 2 ** 31:
+                return {"type": kind, "start": int(values[0]), "deltas": _b64(deltas.astype("<i4"))}
+        return _dict_column(date_strings(series))
+
+    if pd.api.types.is_bool_dtype(series) and not series.hasnans:
+        return {"type": "bool", "data": _b64(series.to_numpy(dtype=np.uint8))}
+
+    if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        if pd.api.types.is_integer_dtype(series) or (np.isfinite(values).all() and (values == np.round(values)).all()):
+            if not series.hasnans and (not len(values) or (values.min() >= -2 ** 31 and values.max() < 2 ** 31)):
+                return {"type": "i32", "data": _b64(series.to_numpy(dtype=np.int64).astype("<i4"))}
+        # float32 only when it changes no value (NaN stays NaN), sums and totals usually need float64
+        as_f32 = values.astype("<f4")
+        if np.array_equal(as_f32.astype(np.float64), values, equal_nan=True):
+            return {"type": "f32", "data": _b64(as_f32)}
+        return {"type": "f64", "data": _b64(values.astype("<f8"))}
+
+    return _dict_column(series)
+
+
+def decode_column(column: dict) -> list:
+    """Inverse of encode_column as plain values (dates as date_strings), the reference for the frontend decoder"""
+    kind = column["type"]
+    if kind == "dict":
+        codes = np.frombuffer(base64.b64decode(column["codes"]), dtype="<" + column["code_type"])
+        values = column["values"]
+        return [values[code] if code >= 0 else None for code in codes.tolist()]
+    if kind in ("date", "datetime"):
+        deltas = np.frombuffer(base64.b64decode(column["deltas"]), dtype="<i4").astype(np.int64)
+        values = column["start"] + np.cumsum(deltas)
+        return np.datetime_as_string(values.astype("datetime64[D]" if kind == "date" else "datetime64[s]")).tolist()
+
+    data = base64.b64decode(column["data"])
+    if kind == "bool":
+        return np.frombuffer(data, dtype=np.uint8).astype(bool).tolist()
+    if kind == "i32":
+        return np.frombuffer(data, dtype="<i4").tolist()
+    if kind in ("f32", "f64"):
+        values = np.frombuffer(data, dtype="<f4" if kind == "f32" else "<f8").astype(np.float64)
+        return [None if np.isnan(v) else v for v in values.tolist()]
+    raise ValueError(f"Unknown column type: {kind}")
+
+
+def encode_values(columns: dict) -> dict:
+    """Chart values {"x": series, "y": series} in the compact format"""
+    return {"encoding": "columnar", **{name: encode_column(series) for name, series in columns.items()}}
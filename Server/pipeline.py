@@ -1,12 +1,18 @@
 
+import os
+import threading
 from pathlib import Path
 from typing import TypedDict, Any, Optional
 from dotenv import load_dotenv
 
 from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
 
 from agents import IngestionAgent, CleaningAgent, AnalyticsAgent, VisualizationAgent, IngestionState, CleaningState, AnalyticsState, VisualizationState
+from cache import get_dashboard_cache, dashboard_cache_key, file_fingerprint
+from streams import buffer_fingerprint
+from agents.cleaning_agent import standardize_column_name
+from cube import AggregationCube, cube_dimensions
+from CFG import PAYLOAD_FORMAT, AGGREGATION_CUBE, CUBE_MAX_CARDINALITY, CUBE_MAX_UNIQUE_RATIO
 
 
 load_dotenv(Path(__file__).parent / 'agents' / '.env')
@@ -14,9 +20,18 @@ load_dotenv(Path(__file__).parent / 'agents' / '.env')
 
 class DashboardState(TypedDict):
 
-    file_path: str
+    file_path: Optional[str]
+    file_obj: Any
+    file_format: Optional[str]
+    missing_strategy: Optional[str]
+    payload_format: Optional[str]
     raw_data: Any
     cleaned_data: Any
+    profile: Any
+    sketches: Any
+    analysis_insights: Any
+    cube: Any
+    sample_scale: float
     visualization_plan: dict
     visualizations: dict
     messages: list
@@ -25,16 +40,16 @@ class DashboardState(TypedDict):
 
 
 class DashboardOrchestrator:
+    """
+    The agents only hold configuration and the compiled graph has no checkpointer, so one
+    instance serves concurrent requests; everything per request lives in DashboardState.
+    """
     
     def __init__(self):
         self.ingestion_agent = IngestionAgent()
         self.cleaning_agent = CleaningAgent()
         self.analytics_agent = AnalyticsAgent()
         self.visualization_agent = VisualizationAgent()
-        self.llm = ChatOpenAI(
-            model="gpt-4o",
-            temperature=0
-        )
         self.graph = self._build_graph()
     
     def _build_graph(self):
@@ -45,6 +60,7 @@ class DashboardOrchestrator:
         workflow.add_node("ingestion", self._ingestion_node)
         workflow.add_node("cleaning", self._cleaning_node)
         workflow.add_node("analytics", self._analytics_node)
+        workflow.add_node("cube", self._cube_node)
         workflow.add_node("visualization", self._visualization_node)
         workflow.add_node("finalize", self._finalize_node)
         
@@ -52,7 +68,8 @@ class DashboardOrchestrator:
         workflow.set_entry_point("ingestion")
         workflow.add_edge("ingestion", "cleaning")
         workflow.add_edge("cleaning", "analytics")
-        workflow.add_edge("analytics", "visualization")
+        workflow.add_edge("analytics", "cube")
+        workflow.add_edge("cube", "visualization")
         workflow.add_edge("visualization", "finalize")
         workflow.add_edge("finalize", END)
         
@@ -62,7 +79,11 @@ class DashboardOrchestrator:
         print("\n Stage 1: Data Ingestion")
         print("-" * 50)
         
-        ingestion_state = IngestionState(file_path=state["file_path"])
+        ingestion_state = IngestionState(
+            file_path=state["file_path"],
+            file_obj=state.get("file_obj"),
+            file_format=state.get("file_format"),
+        )
         result = self.ingestion_agent.load_data(ingestion_state)
         
         state["current_stage"] = "ingestion"
@@ -70,6 +91,13 @@ class DashboardOrchestrator:
         
         if result.status == "completed":
             state["raw_data"] = result.raw_data
+            # chunked ingestion hands over a sample: sums, counts and row totals are scaled up
+            metadata = result.metadata
+            if metadata.get('chunked') and metadata['sample_rows']:
+                file_rows = metadata['shape'][0] - metadata['duplicates_removed']
+                state["sample_scale"] = file_rows / metadata['sample_rows']
+            # sketches cover the whole file, keyed by the column names the cleaning agent produces
+            state["sketches"] = {standardize_column_name(col): s for col, s in result.sketches.items()}
             summary = self.ingestion_agent.get_data_summary(result)
             print(f"Data loaded successfully!")
             print(f"   Shape: {summary['total_rows']} rows × {summary['total_columns']} columns")
@@ -88,7 +116,9 @@ class DashboardOrchestrator:
             print(f"Skipping (previous error)")
             return state
         
-        cleaning_state = CleaningState(raw_data=state["raw_data"])
+        # the cleaning agent takes ownership of the raw frame, drop our reference
+        cleaning_state = CleaningState(raw_data=state["raw_data"], missing_strategy=state.get("missing_strategy"))
+        state["raw_data"] = None
         result = self.cleaning_agent.clean_data(cleaning_state)
         
         state["current_stage"] = "cleaning"
@@ -96,12 +126,15 @@ class DashboardOrchestrator:
         
         if result.status == "completed":
             state["cleaned_data"] = result.cleaned_data
+            state["profile"] = result.profile
             summary = self.cleaning_agent.get_cleaning_summary(result)
             report = summary['cleaning_report']
             print(f"Data cleaned successfully!")
             print(f"Duplicates removed: {report.get('duplicates_removed', 0)}")
             print(f"Rows removed: {report.get('rows_removed', 0)}")
             print(f"Final shape: {report.get('final_shape', 'N/A')}")
+            if report.get('peak_memory_mb') is not None:
+                print(f"Peak memory: {report['peak_memory_mb']} MB (data: {report['data_memory_mb']} MB)")
         else:
             state["error"] = result.error
             print(f"Error: {result.error}")
@@ -116,7 +149,12 @@ class DashboardOrchestrator:
             print(f"Skipping (previous error)")
             return state
         
-        analytics_state = AnalyticsState(cleaned_data=state["cleaned_data"])
+        analytics_state = AnalyticsState(
+            cleaned_data=state["cleaned_data"],
+            profile=state.get("profile"),
+            sketches=state.get("sketches"),
+            sample_scale=state.get("sample_scale") or 1.0,
+        )
         result = self.analytics_agent.analyze_data(analytics_state)
         
         state["current_stage"] = "analytics"
@@ -133,6 +171,7 @@ class DashboardOrchestrator:
                 print(f"   Data completeness: {quality['completeness']:.1f}%")
             if result.visualization_plan:
                 print(f"   Visualization plan created with {len(result.visualization_plan)} items")
+            print(f"   Timings: {', '.join(f'{name} {seconds}s' for name, seconds in result.timings.items())}")
         else:
             state["error"] = result.error
             print(f"Error: {result.error}")
@@ -144,6 +183,31 @@ class DashboardOrchestrator:
         
         return state
     
+    def _cube_node(self, state: DashboardState) -> DashboardState:
+
+        if not AGGREGATION_CUBE or state["error"]:
+            return state
+
+        print("\nStage 3b: Aggregation Cube")
+        print("-" * 50)
+
+        df = state["cleaned_data"]
+        categorical = (state.get("analysis_insights") or {}).get("categorical", {})
+        dimensions = cube_dimensions(df, categorical, CUBE_MAX_CARDINALITY, CUBE_MAX_UNIQUE_RATIO)
+        measures = list(df.select_dtypes(include="number").columns)
+        if dimensions and measures:
+            try:
+                state["cube"] = AggregationCube.build(df, dimensions, measures)
+                print(f"Cube built: {len(dimensions)} dimensions x {len(measures)} measures, "
+                      f"{state['cube'].nbytes / 1024:.1f} KB")
+            except Exception as e:
+                # charts fall back to aggregating the rows
+                print(f"Could not build the aggregation cube: {e}")
+
+        state["current_stage"] = "cube"
+        state["messages"].append(f"Cube: {'completed' if state.get('cube') is not None else 'skipped'}")
+        return state
+
     def _visualization_node(self, state: DashboardState) -> DashboardState:
 
         print("\nStage 4: Visualization")
@@ -155,10 +219,18 @@ class DashboardOrchestrator:
         
         viz_state = VisualizationState(
             cleaned_data=state["cleaned_data"],
-            visualization_plan=state["visualization_plan"]
+            visualization_plan=state["visualization_plan"],
+            payload_format=state.get("payload_format") or PAYLOAD_FORMAT,
+            cube=state.get("cube"),
+            sample_scale=state.get("sample_scale") or 1.0,
         )
         result = self.visualization_agent(viz_state)
         state["visualizations"] = result.visualizations
+        print(f"   Charts: {len(result.visualizations)}")
+        print(f"   Timings: {', '.join(f'{name} {seconds}s' for name, seconds in result.timings.items())}")
+
+        state["current_stage"] = "visualization"
+        state["messages"].append(f"Visualization: {result.status}")
         
         return state
     
@@ -180,15 +252,76 @@ class DashboardOrchestrator:
         
         return state
     
-    def create_dashboard(self, file_path: str) -> dict:
+    @staticmethod
+    def _cube_cache_key(file_digest: str, file_format: str, missing_strategy: Optional[str]) -> str:
+        return dashboard_cache_key(file_digest, file_format, {"missing_strategy": missing_strategy, "cube": True})
+
+    def render_from_cube(self, file_digest: str, file_format: str, chart_plans: list,
+                         missing_strategy: Optional[str] = None, payload_format: Optional[str] = None):
+        """
+        Charts for a changed plan (e.g. sum instead of mean, another x) from the cube cached by an
+        earlier run of the same file, without rerunning the pipeline. None when no cube is cached;
+        charts the cube cannot answer (e.g. raw scatter) are left out.
+        """
+        cache = get_dashboard_cache()
+        cached = cache.get(self._cube_cache_key(file_digest, file_format, missing_strategy)) if cache else None
+        if cached is None:
+            return None
+        viz_state = VisualizationState(
+            visualization_plan={"charts": chart_plans},
+            payload_format=payload_format or PAYLOAD_FORMAT,
+            cube=AggregationCube.from_dict(cached),
+            sample_scale=cached.get("sample_scale", 1.0),
+        )
+        return self.visualization_agent(viz_state).visualizations
+
+    def create_dashboard(self, file_path: Optional[str] = None, use_cache: bool = True, on_update=None,
+                         file_obj: Any = None, file_format: Optional[str] = None, file_digest: Optional[str] = None,
+                         missing_strategy: Optional[str] = None, payload_format: Optional[str] = None) -> dict:
+        """
+        Run the pipeline on file_path, or on an in-memory file_obj (bytes, memoryview or binary
+        file object) of the given file_format, and return the visualizations.
+        file_digest is the SHA-256 of the input if the caller already computed it.
+        missing_strategy overrides CFG.CLEANING_MISSING_STRATEGY for this run, payload_format
+        CFG.PAYLOAD_FORMAT ("json" or "compact") for the chart values.
+        on_update(state) is called after every stage with the current DashboardState.
+        """
         print(f"\nStarting IntelliDash - Dashboard Creation Pipeline")
-        print(f"Input file: {file_path}")
+        print(f"Input file: {file_path if file_obj is None else f'<in-memory {file_format}>'}")
         print("=" * 50)
+
+        if file_obj is None:
+            file_format = Path(file_path).suffix
+        payload_format = payload_format or PAYLOAD_FORMAT
+
+        cache = get_dashboard_cache() if use_cache else None
+        cache_key = None
+        if file_digest is None and cache is not None:
+            if isinstance(file_obj, (bytes, bytearray, memoryview)):
+                file_digest = buffer_fingerprint(file_obj)
+            elif file_obj is None and os.path.isfile(file_path):
+                file_digest = file_fingerprint(file_path)
+        if cache is not None and file_digest is not None:
+            cache_key = dashboard_cache_key(file_digest, file_format, {"missing_strategy": missing_strategy,
+                                                                       "payload_format": payload_format})
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print(f"Cache hit: {cache_key[:12]}, skipping pipeline")
+                return cached
         
         initial_state = DashboardState(
             file_path=file_path,
+            file_obj=file_obj,
+            file_format=file_format,
+            missing_strategy=missing_strategy,
+            payload_format=payload_format,
             raw_data=None,
             cleaned_data=None,
+            profile=None,
+            sketches=None,
+            analysis_insights=None,
+            cube=None,
+            sample_scale=1.0,
             visualization_plan={},
             visualizations={},
             messages=[],
@@ -196,7 +329,20 @@ class DashboardOrchestrator:
             current_stage="init",
         )
         
-        result = self.graph.invoke(initial_state)
+        if on_update is None:
+            result = self.graph.invoke(initial_state)
+        else:
+            result = initial_state
+            for result in self.graph.stream(initial_state, stream_mode="values"):
+                on_update(result)
+
+        # only cache successful runs
+        if cache_key is not None and not result["error"] and result["visualizations"]:
+            cache.set(cache_key, result["visualizations"])
+            if result.get("cube") is not None:
+                cache.set(self._cube_cache_key(file_digest, file_format, missing_strategy),
+                          {**result["cube"].to_dict(), "sample_scale": result.get("sample_scale") or 1.0})
+
         return result["visualizations"]
         
         return {
@@ -209,6 +355,18 @@ class DashboardOrchestrator:
         }
 
 
+_orchestrator = None
+_orchestrator_lock = threading.Lock()
+def get_orchestrator() -> DashboardOrchestrator:
+    """Process-wide orchestrator, agents and graph are built on the first call"""
+
+    global _orchestrator
+    with _orchestrator_lock:
+        if _orchestrator is None:
+            _orchestrator = DashboardOrchestrator()
+    return _orchestrator
+
+
 def main():
 
     file_path = "Walmart_Sales.csv"
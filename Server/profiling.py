@@ -0,0 +1,114 @@
+
+import warnings
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+# quantiles computed for every numeric column, in one batch
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+class Profile:
+    """Per-column statistics of a frame, computed once and shared between the agents"""
+
+    def __init__(self, n_rows: int, columns: list, null_counts: dict, numeric: dict):
+        self.n_rows = n_rows
+        self.columns = columns
+        self.null_counts = null_counts
+        self.numeric = numeric
+
+    @property
+    def total_missing(self) -> int:
+        return int(sum(self.null_counts.values()))
+
+    @property
+    def completeness(self) -> float:
+        n_cells = self.n_rows * len(self.columns)
+        if n_cells == 0:
+            return 100.0
+        return float((1 - self.total_missing / n_cells) * 100)
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """True if the profile still describes df (same rows and columns)"""
+        return len(df) == self.n_rows and list(df.columns) == self.columns
+
+    def data_quality(self) -> dict:
+        return {
+            'total_rows': self.n_rows,
+            'total_columns': len(self.columns),
+            'missing_values': self.total_missing,
+            'completeness': self.completeness,
+        }
+
+
+def _batch_quantiles(values: np.ndarray) -> np.ndarray:
+    """
+    QUANTILES of every column of a NaN-free block (linear interpolation, as pandas),
+    from a single partition around all needed ranks instead of one sort per quantile.
+    The block is partitioned in place, so its rows are reordered within each column.
+    """
+    n = values.shape[0]
+    pos = np.asarray(QUANTILES) * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    values.partition(np.unique(np.concatenate([lo, hi])), axis=0)
+    frac = (pos - lo).reshape((-1,) + (1,) * (values.ndim - 1))
+    return values[lo] * (1 - frac) + values[hi] * frac
+
+
+def _numeric_stats(values: np.ndarray, col_nulls: np.ndarray) -> dict:
+    # column by column, so temporaries (std, NaN filtering) are one column in size, never the whole block
+    n_cols = values.shape[1]
+    stats = {name: np.full(n_cols, np.nan) for name in ('mean', 'std', 'min', 'max', 'q25', 'median', 'q75')}
+    with warnings.catch_warnings():
+        # single values give a NaN std, like pandas
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for j in range(n_cols):
+            column = values[:, j]
+            if col_nulls[j]:
+                column = column[~np.isnan(column)]
+            if not len(column):
+                continue
+            stats['mean'][j] = column.mean()
+            stats['std'][j] = column.std(ddof=1)
+            stats['min'][j] = column.min()
+            stats['max'][j] = column.max()
+            # quantiles last, complete columns are partitioned in place
+            stats['q25'][j], stats['median'][j], stats['q75'][j] = _batch_quantiles(column)
+    return stats
+
+
+def profile_frame(df: pd.DataFrame) -> Profile:
+    """Null counts of every column and mean/median/std/min/max/quartiles of the numeric columns in one pass"""
+    numeric_cols = list(df.select_dtypes(include=[np.number]).columns)
+    null_counts = {}
+    numeric = {}
+
+    if numeric_cols:
+        # one float block for all numeric columns, NaN marks missing values. Filled column by
+        # column: selecting the columns first and converting the selection copies everything twice
+        values = np.empty((len(df), len(numeric_cols)), dtype=np.float64, order='F')
+        for j, col in enumerate(numeric_cols):
+            values[:, j] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        col_nulls = np.isnan(values).sum(axis=0)
+        stats = _numeric_stats(values, col_nulls)
+        for j, col in enumerate(numeric_cols):
+            null_counts[col] = int(col_nulls[j])
+            numeric[col] = {name: float(stats[name][j]) for name in ('mean', 'median', 'std', 'min', 'max', 'q25', 'q75')}
+
+    for col in df.columns:
+        if col not in null_counts:
+            null_counts[col] = int(df[col].isna().sum())
+
+    # keep the frame's column order
+    null_counts = {col: null_counts[col] for col in df.columns}
+    return Profile(len(df), list(df.columns), null_counts, numeric)
+
+
+def ensure_profile(df: pd.DataFrame, profile: Optional[Profile] = None) -> Profile:
+    """Reuse profile if it still describes df, otherwise profile df"""
+    if profile is not None and profile.matches(df):
+        return profile
+    return profile_frame(df)
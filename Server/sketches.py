@@ -0,0 +1,129 @@
+
+import numpy as np
+import pandas as pd
+
+
+def _hash_values(values: pd.Series) -> np.ndarray:
+    """64-bit hashes of the non-null values, equal values hash equally across chunks"""
+    values = values.dropna()
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return pd.util.hash_array(values.to_numpy(), categorize=False)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    # exact for uint64: float64 log2 is only used on 32-bit halves
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide="ignore"):
+        hi_bits = np.floor(np.log2(hi)) + 1
+        lo_bits = np.floor(np.log2(lo)) + 1
+    return np.where(hi > 0, hi_bits + 32, np.where(lo > 0, lo_bits, 0)).astype(np.int64)
+
+
+class HyperLogLog:
+    """Approximate distinct count in 2**precision bytes; relative error about 1.04 / sqrt(2**precision)"""
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # rank = position of the first 1 bit in the remaining 64 - p bits
+        rest = hashes << p
+        rank = np.where(rest == 0, 64 - self.precision + 1, 64 - _bit_length(rest) + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def update(self, values: pd.Series):
+        self.add_hashes(_hash_values(values))
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # small range correction: linear counting
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """
+    Mergeable heavy-hitters summary keeping at most capacity counters. Every counter has
+    an upper bound (counts) and the amount it may overestimate by (errors).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+
+    def _floor(self) -> int:
+        # count an untracked value may have had, 0 while the summary is not full
+        return int(self.counts.min()) if len(self.counts) >= self.capacity else 0
+
+    def _combine(self, counts: pd.Series, errors: pd.Series, floor: int):
+        own_floor = self._floor()
+        merged = self.counts.add(counts, fill_value=0)
+        merged_errors = self.errors.add(errors, fill_value=0)
+        # values missing from one side may have been counted up to that side's floor
+        for side, side_floor in ((self.counts, own_floor), (counts, floor)):
+            if side_floor:
+                unseen = ~merged.index.isin(side.index)
+                merged[unseen] += side_floor
+                merged_errors[unseen] += side_floor
+        self.counts = merged.astype(np.int64).nlargest(self.capacity, keep="first")
+        self.errors = merged_errors.reindex(self.counts.index).astype(np.int64)
+
+    def update(self, values: pd.Series):
+        # exact counts of the chunk, cut to the capacity before merging
+        counts = values.value_counts(dropna=True, sort=True)
+        if isinstance(counts.index, pd.CategoricalIndex):
+            # unused categories are listed with a count of 0
+            counts = counts[counts > 0]
+            counts.index = counts.index.astype(object)
+        floor = int(counts.iloc[self.capacity]) if len(counts) > self.capacity else 0
+        counts = counts.iloc[:self.capacity]
+        self._combine(counts, pd.Series(0, index=counts.index, dtype=np.int64), floor)
+
+    def merge(self, other: "SpaceSaving"):
+        self._combine(other.counts, other.errors, other._floor())
+
+    def top(self, n: int) -> dict:
+        """The n most frequent values with their guaranteed (lower bound) counts"""
+        return (self.counts - self.errors).nlargest(n, keep="first").to_dict()
+
+
+class CategoricalSketch:
+    """Unique count and top values of one column, updated chunk by chunk"""
+
+    def __init__(self, precision: int = 14, capacity: int = 1024):
+        self.hll = HyperLogLog(precision)
+        self.heavy_hitters = SpaceSaving(capacity)
+        self.rows = 0
+
+    def update(self, values: pd.Series):
+        self.rows += len(values)
+        self.hll.update(values)
+        self.heavy_hitters.update(values)
+
+    def merge(self, other: "CategoricalSketch"):
+        self.rows += other.rows
+        self.hll.merge(other.hll)
+        self.heavy_hitters.merge(other.heavy_hitters)
+
+    def unique_count(self) -> int:
+        return self.hll.count()
+
+    def top_values(self, n: int = 5) -> dict:
+        return self.heavy_hitters.top(n)
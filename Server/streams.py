@@ -0,0 +1,116 @@
+
+import io
+import os
+import hashlib
+import tempfile
+
+
+class HashingBuffer(io.BytesIO):
+    """
+    In-memory upload sink that hashes the bytes as they are written. keep() hands the buffer
+    over to a consumer holding a view of it (getbuffer), closing it is then left to garbage
+    collection: BytesIO cannot close while a view exists.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._digest = hashlib.sha256()
+        self._keep = False
+
+    def keep(self) -> memoryview:
+        self._keep = True
+        return self.getbuffer()
+
+    def close(self):
+        if not self._keep:
+            super().close()
+
+    def write(self, data) -> int:
+        self._digest.update(data)
+        return super().write(data)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+class HashingFile(io.FileIO):
+    """
+    On-disk upload sink for uploads too large to keep in memory, hashes the bytes as they are
+    written. The file is removed when the request closes it, unless keep() handed it over to
+    a consumer, which then removes path itself.
+    """
+
+    def __init__(self, directory: str, suffix: str = ""):
+        fd, self.path = tempfile.mkstemp(suffix=suffix, dir=directory)
+        super().__init__(fd, "r+")
+        self._digest = hashlib.sha256()
+        self._keep = False
+
+    def keep(self) -> str:
+        self._keep = True
+        return self.path
+
+    def close(self):
+        super().close()
+        if not self._keep and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write(self, data) -> int:
+        self._digest.update(data)
+        return super().write(data)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+class MemoryviewReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over a bytes-like buffer without copying it.
+    Every consumer gets its own reader, so parsing and archiving can share one buffer.
+    """
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        chunk = self._view[self._pos:self._pos + len(b)]
+        n = len(chunk)
+        b[:n] = chunk
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        self._pos = max(0, pos)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+
+def open_source(source):
+    """Input pandas can read: paths and file objects pass through, buffers are wrapped without copying"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return MemoryviewReader(source)
+    return source
+
+
+def buffer_fingerprint(data) -> str:
+    return hashlib.sha256(memoryview(data)).hexdigest()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the server modules are imported top-level (import CFG, from agents... import ...), as in main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
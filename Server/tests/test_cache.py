@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+import CFG
+import cache
+from cache import DiskCache, MemoryCache, dashboard_cache_key
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+def test_key_is_stable():
+    assert dashboard_cache_key("abc", ".csv", {"a": 1, "b": 2}) == dashboard_cache_key("abc", ".CSV", {"b": 2, "a": 1})
+
+
+def test_key_changes_with_file_format_and_options():
+    key = dashboard_cache_key("abc", ".csv")
+    assert dashboard_cache_key("abd", ".csv") != key
+    assert dashboard_cache_key("abc", ".xlsx") != key
+    assert dashboard_cache_key("abc", ".csv", {"payload_format": "compact"}) != key
+
+
+def test_key_changes_with_settings(monkeypatch):
+    key = dashboard_cache_key("abc", ".csv")
+    monkeypatch.setattr(CFG, "MAX_DENSITY", CFG.MAX_DENSITY + 1)
+    assert dashboard_cache_key("abc", ".csv") != key
+
+
+def test_memory_cache_evicts_least_recently_used():
+    store = MemoryCache(max_entries=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    assert store.get("a") == 1  # a is now the most recently used
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1
+    assert store.get("c") == 3
+    assert len(store) == 2
+
+
+def test_memory_cache_expires_entries(clock):
+    store = MemoryCache(max_entries=2, ttl=60)
+    store.set("a", 1)
+    clock.now += 59
+    assert store.get("a") == 1
+    clock.now += 2
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def test_disk_cache_round_trip_and_ttl(tmp_path, clock):
+    store = DiskCache(directory=str(tmp_path), max_entries=4, ttl=60)
+    store.set("a", {"charts": [1, 2]})
+    assert store.get("a") == {"charts": [1, 2]}
+    clock.now += 61
+    assert store.get("a") is None
+    assert not os.listdir(tmp_path)
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    store = DiskCache(directory=str(tmp_path), max_entries=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    # a was read after b was written
+    os.utime(store._path("a"), (2000, 2000))
+    os.utime(store._path("b"), (1000, 1000))
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1
+    assert store.get("c") == 3
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import agents.visualization_agent.__main__ as visualization
+from cube import AggregationCube
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    rows = 5000
+    sales = rng.normal(100, 20, size=rows)
+    sales[::13] = np.nan
+    return pd.DataFrame({
+        "store": rng.integers(1, 6, size=rows),
+        "region": pd.Categorical(rng.choice(["north", "south", "east"], size=rows)),
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 900, size=rows), unit="D"),
+        "sales": sales,
+        "units": rng.integers(0, 50, size=rows),
+    })
+
+
+@pytest.fixture
+def cube(df):
+    return AggregationCube.build(df, ["store", "region", "date"], ["sales", "units"])
+
+
+@pytest.mark.parametrize("dimension", ["store", "region"])
+def test_aggregate_matches_groupby(df, cube, dimension):
+    aggregations = {"sales": ["sum", "mean", "count"], "units": ["sum", "mean"]}
+    expected = df.groupby(dimension, observed=True).agg(aggregations)
+    result = cube.aggregate(dimension, aggregations)
+    pd.testing.assert_frame_equal(result, expected, check_names=False, check_index_type=False)
+
+
+def test_totals_match_the_rows(df, cube):
+    for measure in ("sales", "units"):
+        for agg in ("sum", "mean", "count"):
+            assert cube.total(measure, agg) == pytest.approx(df[measure].agg(agg))
+    assert isinstance(cube.total("units", "sum"), (int, np.integer))
+
+
+def test_resampled_dates_match_the_row_path(df, cube):
+    # 900 days are more than MAX_DENSITY, both paths regroup them into the same periods
+    aggregations = {"sales": ["sum", "mean"], "units": ["count"]}
+    expected = visualization._aggregate(df, "date", aggregations)
+    result = visualization._aggregate(df, "date", aggregations, cube)
+    pd.testing.assert_frame_equal(result, expected, check_names=False)
+
+
+def test_round_trip_through_dict(df, cube):
+    restored = AggregationCube.from_dict(cube.to_dict())
+    aggregations = {"sales": ["mean"], "units": ["sum"]}
+    for dimension in ("store", "region", "date"):
+        pd.testing.assert_frame_equal(
+            restored.aggregate(dimension, aggregations), cube.aggregate(dimension, aggregations),
+            check_names=False, check_index_type=False, check_categorical=False,
+        )
+
+
+def test_covers(cube):
+    assert cube.covers("store", ["sales"])
+    assert not cube.covers("sales", ["units"])
+    assert not cube.covers("store", ["missing"])
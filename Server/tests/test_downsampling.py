@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsampling import DOWNSAMPLERS, downsample
+
+N = 10_000
+MAX_POINTS = 200
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    xs = pd.Series(np.arange(N, dtype=np.float64))
+    ys = pd.Series(np.cumsum(rng.normal(size=N)))
+    ys.iloc[[17, 4321]] = np.nan
+    return xs, ys
+
+
+@pytest.mark.parametrize("method", list(DOWNSAMPLERS))
+def test_indices_are_sorted_unique_and_in_range(series, method):
+    xs, ys = series
+    index = DOWNSAMPLERS[method](xs.to_numpy(), ys.to_numpy(), MAX_POINTS)
+    assert len(index) <= MAX_POINTS
+    assert np.all(np.diff(index) > 0)
+    assert index[0] >= 0 and index[-1] < N
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_line_methods_keep_the_end_points(series, method):
+    xs, ys = series
+    index = DOWNSAMPLERS[method](xs.to_numpy(), ys.to_numpy(), MAX_POINTS)
+    assert index[0] == 0 and index[-1] == N - 1
+
+
+def test_minmax_keeps_the_extremes(series):
+    xs, ys = series
+    index = DOWNSAMPLERS["minmax"](xs.to_numpy(), ys.to_numpy(), MAX_POINTS)
+    assert ys.idxmax() in index and ys.idxmin() in index
+
+
+def test_grid_keeps_outliers():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=N)
+    y = rng.normal(size=N)
+    x[123], y[123] = 100.0, 100.0
+    assert 123 in DOWNSAMPLERS["grid"](x, y, MAX_POINTS)
+
+
+def test_downsample_keeps_x_y_pairs_and_short_series(series):
+    xs, ys = series
+    small_xs, small_ys = downsample(xs, ys, MAX_POINTS, "lttb")
+    assert len(small_xs) == len(small_ys) <= MAX_POINTS
+    assert (small_xs.index == small_ys.index).all()
+    short = downsample(xs.iloc[:50], ys.iloc[:50], MAX_POINTS, "lttb")
+    assert short[0] is not None and len(short[0]) == 50
+
+
+def test_dates_as_x():
+    xs = pd.Series(pd.date_range("2020-01-01", periods=N, freq="h"))
+    ys = pd.Series(np.sin(np.arange(N) / 50))
+    small_xs, _ = downsample(xs, ys, MAX_POINTS, "lttb")
+    assert small_xs.is_monotonic_increasing
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        downsample(pd.Series([1]), pd.Series([1]), 1, "median")
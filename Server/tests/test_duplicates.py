@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from agents.cleaning_agent import DuplicateFilter
+
+
+def _frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "store": rng.integers(0, 5, size=rows),
+        "region": rng.choice(["north", "south"], size=rows),
+        "sales": rng.integers(0, 3, size=rows).astype(np.float64),
+    })
+
+
+def test_marks_duplicates_across_chunks_like_pandas():
+    df = _frame(5000, 0)
+    seen = DuplicateFilter()
+    marked = np.concatenate([seen.mark(df.iloc[start:start + 700]) for start in range(0, len(df), 700)])
+    np.testing.assert_array_equal(marked, df.duplicated().to_numpy())
+    assert len(seen) == len(df.drop_duplicates())
+
+
+def test_integer_rows_match_float_rows_of_later_chunks():
+    # a missing value in the second chunk turns its integer column into floats
+    first = pd.DataFrame({"store": [1, 2], "sales": [10, 20]})
+    second = pd.DataFrame({"store": [1, 3], "sales": [10.0, np.nan]})
+    seen = DuplicateFilter()
+    seen.mark(first)
+    assert seen.mark(second).tolist() == [True, False]
+
+
+def test_mark_without_remember_leaves_filter_unchanged():
+    seen = DuplicateFilter()
+    seen.mark(pd.DataFrame({"a": [1, 2]}))
+    assert seen.mark(pd.DataFrame({"a": [3, 3]}), remember=False).tolist() == [False, True]
+    assert seen.mark(pd.DataFrame({"a": [3]})).tolist() == [False]
+    assert len(seen) == 3
+
+
+def test_merge_of_separately_read_chunks():
+    df = _frame(3000, 1)
+    left, right = DuplicateFilter(), DuplicateFilter()
+    left.mark(df.iloc[:1500])
+    right.mark(df.iloc[1500:])
+    left.merge(right)
+    assert len(left) == len(df.drop_duplicates())
+    assert left.mark(df).all()
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from agents.cleaning_agent import CleaningAgent
+
+parse_numeric = CleaningAgent._parse_numeric
+
+
+def test_plain_numbers():
+    numbers, kind, formatted = parse_numeric(pd.Series(["1", "2.5", "-3"]))
+    assert numbers.tolist() == [1, 2.5, -3]
+    assert (kind, formatted) == ("numeric", False)
+
+
+def test_currency():
+    numbers, kind, formatted = parse_numeric(pd.Series(["$1,234.50", "$20", "(1,000)"]))
+    assert numbers.tolist() == [1234.5, 20, -1000]
+    assert (kind, formatted) == ("currency", True)
+
+
+def test_currency_symbol_after_the_amount():
+    numbers, kind, _ = parse_numeric(pd.Series(["1 234 €", "56 €"]))
+    assert numbers.tolist() == [1234, 56]
+    assert kind == "currency"
+
+
+def test_percent():
+    numbers, kind, formatted = parse_numeric(pd.Series(["12%", "7.5%", "100%"]))
+    assert numbers.tolist() == [12, 7.5, 100]
+    assert (kind, formatted) == ("percent", True)
+
+
+def test_thousands_separators():
+    numbers, kind, formatted = parse_numeric(pd.Series(["1,234", "12,345,678", "9"]))
+    assert numbers.tolist() == [1234, 12345678, 9]
+    assert (kind, formatted) == ("numeric", True)
+
+
+def test_unparseable_values_become_nan():
+    numbers, _, _ = parse_numeric(pd.Series(["$10", "$20", "n/a"]))
+    assert numbers.iloc[:2].tolist() == [10, 20]
+    assert np.isnan(numbers.iloc[2])
+
+
+def test_formatted_flag_of_the_sample_applies_to_the_column():
+    # the sample needed formatting stripped, so the column is parsed the same way
+    numbers, _, formatted = parse_numeric(pd.Series(["5", "6"]), formatted=True)
+    assert numbers.tolist() == [5, 6] and formatted
+    numbers, kind, formatted = parse_numeric(pd.Series(["$5", "6"]), formatted=False)
+    assert np.isnan(numbers.iloc[0]) and (kind, formatted) == ("numeric", False)
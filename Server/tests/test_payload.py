@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from payload import decode_column, encode_column, encode_values
+
+
+def _plain(series: pd.Series) -> list:
+    return [None if pd.isna(value) else value for value in series.tolist()]
+
+
+@pytest.mark.parametrize("series, kind", [
+    (pd.Series([1, 2, -3], dtype=np.int64), "i32"),
+    (pd.Series([1.0, 2.0, 3.0]), "i32"),
+    (pd.Series([1.5, np.nan, 0.25]), "f32"),
+    (pd.Series([6737218987.11, 0.1, np.nan]), "f64"),
+    (pd.Series([2 ** 40 + 1, 1], dtype=np.int64), "f64"),
+    (pd.Series([True, False, True]), "bool"),
+    (pd.Series(["a", None, "b", "a"]), "dict"),
+    (pd.Series(pd.Categorical(["x", "y", "x"])), "dict"),
+])
+def test_round_trip(series, kind):
+    column = encode_column(series)
+    assert column["type"] == kind
+    assert decode_column(column) == _plain(series)
+
+
+def test_dates_round_trip_as_iso_strings():
+    dates = pd.Series(pd.to_datetime(["2012-02-10", "2010-02-05", "2011-12-30"]))
+    column = encode_column(dates)
+    assert column["type"] == "date"
+    assert decode_column(column) == ["2012-02-10", "2010-02-05", "2011-12-30"]
+
+
+def test_datetimes_keep_the_time_of_day():
+    dates = pd.Series(pd.to_datetime(["2024-03-01 08:30:00", "2024-03-01 17:45:10"]))
+    column = encode_column(dates)
+    assert column["type"] == "datetime"
+    assert decode_column(column) == ["2024-03-01T08:30:00", "2024-03-01T17:45:10"]
+
+
+def test_missing_dates_fall_back_to_strings():
+    dates = pd.Series(pd.to_datetime(["2024-03-01", None]))
+    assert decode_column(encode_column(dates)) == ["2024-03-01", None]
+
+
+def test_many_categories_use_wider_codes():
+    series = pd.Series([f"v{i}" for i in range(300)])
+    column = encode_column(series)
+    assert column["code_type"] == "i2"
+    assert decode_column(column) == series.tolist()
+
+
+def test_values_are_json():
+    values = encode_values({"x": pd.Series(["a", "b"]), "y": pd.Series([1.5, 2.5])})
+    values = json.loads(json.dumps(values))
+    assert values["encoding"] == "columnar"
+    assert decode_column(values["x"]) == ["a", "b"]
+    assert decode_column(values["y"]) == [1.5, 2.5]